@@ -41,6 +41,22 @@ setup(
             "pytest>=6.0",
             "pytest-timeout>=2.0",
             "pytest-cov>=3.0",
+            "pytest-xdist>=3.0",
+        ],
+        "re2": [
+            "google-re2>=1.0",
+        ],
+        "ahocorasick": [
+            "pyahocorasick>=2.0",
+        ],
+        "ftfy": [
+            "ftfy>=6.0",
+        ],
+        "orjson": [
+            "orjson>=3.8",
+        ],
+        "http2": [
+            "httpx[http2]>=0.24",
         ],
     },
     entry_points={
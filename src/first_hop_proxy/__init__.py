@@ -10,18 +10,24 @@ __author__ = "First Hop Proxy Team"
 
 # Main exports
 from .config import Config
-from .proxy_client import ProxyClient
+from .proxy_client import ProxyClient, BatchingProxyClient
+from .async_proxy_client import AsyncProxyClient
 from .error_handler import ErrorHandler
 from .response_parser import ResponseParser
 from .request_logger import RequestLogger
 from .error_logger import ErrorLogger
-from .utils import sanitize_headers_for_logging, process_messages_with_regex, process_response_with_regex
+from .utils import (
+    sanitize_headers_for_logging, process_messages_with_regex, process_response_with_regex, fix_mojibake,
+    normalize_nfc
+)
 from .constants import *
 from .main import main, app
 
 __all__ = [
     'Config',
     'ProxyClient', 
+    'BatchingProxyClient',
+    'AsyncProxyClient',
     'ErrorHandler',
     'ResponseParser',
     'RequestLogger',
@@ -29,6 +35,8 @@ __all__ = [
     'sanitize_headers_for_logging',
     'process_messages_with_regex',
     'process_response_with_regex',
+    'fix_mojibake',
+    'normalize_nfc',
     'main',
     'app',
 ]
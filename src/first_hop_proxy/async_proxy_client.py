@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+from urllib.parse import urljoin
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from .proxy_client import ProxyClient
+from .utils import sanitize_headers_for_logging, process_response_with_regex
+from .constants import ASYNC_MAX_CONNECTIONS, ASYNC_MAX_KEEPALIVE_CONNECTIONS
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncProxyClient:
+    """Asynchronous client that multiplexes requests to the target proxy over HTTP/2"""
+    
+    def __init__(self, target_url: str, config=None, http2: bool = True):
+        """Initialize async proxy client with target URL; requires the optional httpx dependency"""
+        if httpx is None:
+            raise ImportError("AsyncProxyClient requires httpx; install first-hop-proxy[http2]")
+        self.target_url = target_url.rstrip('/')
+        self.config = config
+        limits = httpx.Limits(
+            max_connections=ASYNC_MAX_CONNECTIONS,
+            max_keepalive_connections=ASYNC_MAX_KEEPALIVE_CONNECTIONS
+        )
+        self.client = httpx.AsyncClient(http2=http2, limits=limits)
+    
+    async def aclose(self):
+        """Close the underlying connection pool"""
+        await self.client.aclose()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+    
+    async def forward_request(self, request_data: Dict[str, Any],
+                              headers: Optional[Dict[str, str]] = None,
+                              timeout: Optional[int] = None,
+                              endpoint: str = "/chat/completions",
+                              method: str = "POST") -> Any:
+        """Forward request to target proxy and return the parsed JSON response"""
+        target_url = urljoin(self.target_url, endpoint) if endpoint else self.target_url
+        request_headers = ProxyClient._prepare_headers(headers)
+        logger.info(f"Async request to: {target_url}")
+        logger.info(f"Request headers: {sanitize_headers_for_logging(request_headers)}")
+        
+        response = await self.client.request(
+            method, target_url, headers=request_headers, json=request_data, timeout=timeout
+        )
+        logger.info(f"Status code: {response.status_code} ({response.http_version})")
+        
+        # Raise httpx.HTTPStatusError for non-2xx responses
+        response.raise_for_status()
+        response_json = response.json()
+        
+        # Apply response processing rules if enabled
+        if self.config and hasattr(self.config, 'get_response_processing_config'):
+            response_processing_config = self.config.get_response_processing_config()
+            rules = response_processing_config.get("rules", [])
+            fix_encoding = response_processing_config.get("fix_mojibake", False)
+            normalize = response_processing_config.get("normalize_unicode", False)
+            if response_processing_config.get("enabled", False) and (rules or fix_encoding or normalize):
+                response_json = process_response_with_regex(response_json, rules, fix_encoding, normalize)
+        
+        return response_json
+    
+    async def forward_many(self, payloads: List[Dict[str, Any]], **kwargs) -> List[Any]:
+        """Forward several requests concurrently over the shared connection, in payload order"""
+        return await asyncio.gather(*(self.forward_request(payload, **kwargs) for payload in payloads))
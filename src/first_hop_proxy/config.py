@@ -1,9 +1,11 @@
 import yaml
 import os
 import logging
+import re
 from urllib.parse import urlparse
 from typing import Dict, Any, Optional
 from .constants import DEFAULT_CONFIG
+from .utils import validate_regex_rule
 
 logger = logging.getLogger(__name__)
 
@@ -154,6 +156,11 @@ class Config:
                     if not all(flag in valid_flags for flag in flags):
                         raise ValueError(f"regex_replacement.rules[{i}].flags must contain only valid regex flags: {valid_flags}")
                     
+                    try:
+                        validate_regex_rule(pattern, replacement, flags)
+                    except re.error as e:
+                        raise ValueError(f"regex_replacement.rules[{i}] is not a valid regex rule: {e}")
+                    
                     apply_to = rule.get("apply_to", "all")
                     if not isinstance(apply_to, str) or apply_to.lower() not in ["all", "user", "assistant", "system"]:
                         raise ValueError(f"regex_replacement.rules[{i}].apply_to must be one of: all, user, assistant, system")
@@ -164,6 +171,12 @@ class Config:
             if not isinstance(response_processing_config.get("enabled"), bool):
                 raise ValueError("response_processing.enabled must be a boolean value")
             
+            if not isinstance(response_processing_config.get("fix_mojibake", False), bool):
+                raise ValueError("response_processing.fix_mojibake must be a boolean value")
+            
+            if not isinstance(response_processing_config.get("normalize_unicode", False), bool):
+                raise ValueError("response_processing.normalize_unicode must be a boolean value")
+            
             if response_processing_config.get("enabled", False):
                 rules = response_processing_config.get("rules", [])
                 if not isinstance(rules, list):
@@ -190,6 +203,11 @@ class Config:
                     if not all(flag in valid_flags for flag in flags):
                         raise ValueError(f"response_processing.rules[{i}].flags must contain only valid regex flags: {valid_flags}")
                     
+                    try:
+                        validate_regex_rule(pattern, replacement, flags)
+                    except re.error as e:
+                        raise ValueError(f"response_processing.rules[{i}] is not a valid regex rule: {e}")
+                    
                     description = rule.get("description", "")
                     if not isinstance(description, str):
                         raise ValueError(f"response_processing.rules[{i}].description must be a string")
@@ -16,7 +16,7 @@ FAIL_CODES = [400, 401, 403, 405, 406, 407, 411, 412, 413, 414, 415, 416, 417, 4
 CONDITIONAL_RETRY_CODES = [404, 411, 412, 413, 414, 416, 417, 418, 421, 423, 424, 425, 426, 428, 431, 451]
 
 # Sensitive headers that should be sanitized in logs
-SENSITIVE_HEADERS = {'authorization', 'x-api-key', 'api-key'}
+SENSITIVE_HEADERS = frozenset({'authorization', 'x-api-key', 'api-key'})
 
 # Headers that should NOT be forwarded to target proxy
 SKIP_HEADERS = {
@@ -24,6 +24,37 @@ SKIP_HEADERS = {
     'proxy-connection', 'upgrade', 'transfer-encoding'
 }
 
+# Connection pool sizing for the pooled session held by each ProxyClient
+POOL_CONNECTIONS = 32
+POOL_MAXSIZE = 64
+
+# TCP keepalive for pooled upstream sockets, in seconds and probe count
+TCP_KEEPALIVE_IDLE = 60
+TCP_KEEPALIVE_INTERVAL = 15
+TCP_KEEPALIVE_COUNT = 4
+
+# Results of apply_regex_replacements kept per ruleset, for texts up to the given length
+REGEX_RESULT_CACHE_SIZE = 1024
+REGEX_RESULT_CACHE_MAX_LENGTH = 64000
+
+# Response choices are processed on a thread pool only on free-threaded Python builds,
+# when there are several of them and at least one has this many characters
+PARALLEL_CHOICE_MIN_LENGTH = 2048
+PARALLEL_CHOICE_WORKERS = 4
+
+# Maximum number of upstream responses kept by each ProxyClient's response cache
+RESPONSE_CACHE_SIZE = 1024
+
+# Request methods whose responses ProxyClient caches unless cache_post is set
+CACHEABLE_METHODS = frozenset({'GET', 'HEAD'})
+
+# Connection limits for the HTTP/2 AsyncProxyClient
+ASYNC_MAX_CONNECTIONS = 100
+ASYNC_MAX_KEEPALIVE_CONNECTIONS = 20
+
+# Upstream endpoint that accepts {"requests": [...]} and answers {"responses": [...]}
+DEFAULT_BATCH_ENDPOINT = "/v1/batch"
+
 # Error patterns that indicate blank responses
 BLANK_RESPONSE_PATTERNS = [
     "I'm sorry, I can't",
@@ -7,6 +7,7 @@ import uuid
 import time
 import sys
 import os
+import threading
 from typing import Dict, Any, Optional
 from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
@@ -43,6 +44,22 @@ request_logger = None
 global error_logger
 error_logger = None
 
+# Proxy clients keyed by target URL, kept so their connection pools outlive a single request
+_proxy_clients: Dict[str, ProxyClient] = {}
+_proxy_clients_lock = threading.Lock()
+
+
+def get_proxy_client(target_url: str) -> ProxyClient:
+    """Return the shared proxy client for a target URL, creating it on first use"""
+    proxy_client = _proxy_clients.get(target_url)
+    if proxy_client is None:
+        # Create under the lock so concurrent first requests share one client and pool
+        with _proxy_clients_lock:
+            proxy_client = _proxy_clients.get(target_url)
+            if proxy_client is None:
+                proxy_client = _proxy_clients[target_url] = ProxyClient(target_url, config=config)
+    return proxy_client
+
 
 def forward_request(request_data: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
     """Forward request to target proxy with error handling and retry logic"""
@@ -77,8 +94,8 @@ def forward_request(request_data: Dict[str, Any], headers: Optional[Dict[str, st
             conditional_retry_codes=conditional_retry_codes
         )
         
-        # Create proxy client
-        proxy_client = ProxyClient(target_url, config=config)
+        # Reuse the pooled proxy client for this target
+        proxy_client = get_proxy_client(target_url)
         
         # Define the request function that will be retried
         def make_request():
@@ -146,8 +163,8 @@ def models_endpoint():
         base_url = target_url.replace("/chat/completions", "")
         models_url = f"{base_url}/models"
         
-        # Create proxy client for models endpoint
-        proxy_client = ProxyClient(models_url, config=config)
+        # Reuse the pooled proxy client for the models endpoint
+        proxy_client = get_proxy_client(models_url)
         
         # Create error handler for models request
         error_config = config.get_error_handling_config()
@@ -234,6 +251,10 @@ def chat_completions():
         
         # Forward the request
         result = forward_request(request_data, dict(request.headers))
+        
+        # Relay upstream event streams chunk by chunk; hard stop responses are still JSON
+        if request_data.get("stream", False) and not isinstance(result, dict):
+            return Response(result, mimetype="text/event-stream")
         return jsonify(result)
         
     except Exception as e:
@@ -1,27 +1,105 @@
 import requests
+import http.cookiejar
 import json
 import logging
+import queue
 import re
-from typing import Dict, Any, Optional
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing
+from typing import Dict, Any, Iterator, List, Optional
 from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+try:
+    import orjson  # faster (de)serialization for large payloads, used when installed
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
 
 from .utils import sanitize_headers_for_logging, process_response_with_regex
-from .constants import SKIP_HEADERS, BLANK_RESPONSE_PATTERNS
+from .constants import (
+    SKIP_HEADERS, SENSITIVE_HEADERS, BLANK_RESPONSE_PATTERNS, POOL_CONNECTIONS, POOL_MAXSIZE,
+    DEFAULT_BATCH_ENDPOINT, RESPONSE_CACHE_SIZE, TCP_KEEPALIVE_IDLE, TCP_KEEPALIVE_INTERVAL,
+    TCP_KEEPALIVE_COUNT, CACHEABLE_METHODS
+)
 from .response_parser import ResponseParser
+from .response_cache import ResponseCache
+
+
+def _keepalive_socket_options() -> List[tuple]:
+    """Socket options enabling TCP keepalive, skipping tunables the platform lacks"""
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    for name, value in (("TCP_KEEPIDLE", TCP_KEEPALIVE_IDLE),
+                        ("TCP_KEEPINTVL", TCP_KEEPALIVE_INTERVAL),
+                        ("TCP_KEEPCNT", TCP_KEEPALIVE_COUNT)):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled sockets use TCP keepalive
+    
+    Idle connections are probed instead of being silently dropped by
+    middleboxes, so a request after a quiet period does not land on a
+    half-open socket.
+    """
+    
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs.setdefault("socket_options", _keepalive_socket_options())
+        super().init_poolmanager(*args, **kwargs)
 
 
 class ProxyClient:
     """Client for forwarding requests to target proxy"""
     
-    def __init__(self, target_url: str, error_logger=None, config=None):
-        """Initialize proxy client with target URL and optional error logger"""
+    def __init__(self, target_url: str, error_logger=None, config=None, max_workers: int = 16,
+                 cache_size: int = RESPONSE_CACHE_SIZE, cache_authorized: bool = False,
+                 cache_post: bool = False):
+        """Initialize proxy client with target URL and optional error logger
+        
+        Responses are cached only when the upstream marks them cacheable, and
+        only for GET and HEAD requests unless cache_post is set. Requests
+        carrying credentials bypass the cache unless cache_authorized is set.
+        A cache_size of 0 disables caching.
+        """
         self.target_url = target_url.rstrip('/')
         self.error_logger = error_logger
         self.config = config
         self.response_parser = ResponseParser(config) if config else None
+        self.cache = ResponseCache(cache_size) if cache_size else None
+        self.cache_authorized = cache_authorized
+        self.cache_post = cache_post
+        
+        # Pooled session so repeated requests reuse TCP/TLS connections
+        # Retries are left to ErrorHandler, so the adapter never retries on its own
+        self.session = requests.Session()
+        # The session is shared by every caller of this target, so upstream cookies must not be replayed
+        self.session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        adapter = KeepAliveAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # Worker threads for forward_many; they share the session's connection pool
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="proxy-client")
+    
+    def close(self):
+        """Close the pooled session and release its connections"""
+        self._pool.shutdown(wait=False)
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
     
     def forward_request(self, request_data: Dict[str, Any], 
                        headers: Optional[Dict[str, str]] = None,
@@ -39,18 +117,7 @@ class ProxyClient:
         logger.info(f"Target URL: {target_url}")
         logger.info(f"Method: {method}")
         
-        # Prepare headers
-        request_headers = {
-            "Content-Type": "application/json",
-            "User-Agent": "SillyTavern-Proxy/1.0"
-        }
-        
-        # Forward headers from SillyTavern (including Authorization/API keys)
-        # But filter out problematic headers that should not be forwarded
-        if headers:
-            for key, value in headers.items():
-                if key.lower() not in SKIP_HEADERS:
-                    request_headers[key] = value
+        request_headers = self._prepare_headers(headers)
         
         # Add retry count header if provided
         if retry_count is not None:
@@ -58,38 +125,73 @@ class ProxyClient:
         
         logger.info(f"Request headers: {sanitize_headers_for_logging(request_headers)}")
         
-        # Prepare request parameters
+        # Prepare request parameters; orjson emits UTF-8 bytes directly
         request_params = {
             "method": method,
             "url": target_url,
-            "headers": request_headers,
-            "json": request_data
+            "headers": request_headers
         }
+        if orjson is not None:
+            try:
+                request_params["data"] = orjson.dumps(request_data)
+            except orjson.JSONEncodeError:
+                # e.g. integers beyond 64 bits, which requests' json= still serializes
+                request_params["json"] = request_data
+        else:
+            request_params["json"] = request_data
         
         if timeout is not None:
             request_params["timeout"] = timeout
         
+        # Streaming bodies are relayed as they arrive instead of being downloaded up front
+        streaming = request_data.get("stream", False)
+        if streaming:
+            request_params["stream"] = True
+        
+        # Serve fresh cached responses, or revalidate stale ones conditionally
+        cache_key, cache_entry = self._cache_lookup(method, target_url, request_data, request_params, streaming)
+        validator_headers = {}
+        if cache_entry is not None:
+            if cache_entry.is_fresh():
+                logger.info(f"Serving cached response for: {target_url}")
+                return cache_entry.value
+            validator_headers = cache_entry.validator_headers()
+            request_headers.update(validator_headers)
+        
         logger.info(f"Request timeout: {timeout}")
         logger.info(f"Making HTTP request to: {target_url}")
         
         # Make the request
-        response = requests.request(**request_params)
+        response = self.session.request(**request_params)
         
         # Log response details
         logger.info(f"=== HTTP RESPONSE ===")
         logger.info(f"Status code: {response.status_code}")
         logger.info(f"Response headers: {sanitize_headers_for_logging(dict(response.headers))}")
-        logger.info(f"Response size: {len(response.content)} bytes")
         
-        # Handle streaming responses
-        if request_data.get("stream", False):
+        if cache_entry is not None and response.status_code == 304:
+            logger.info("Upstream confirmed the cached response is still valid")
+            cached_value = self.cache.refresh(cache_key, response.headers)
+            if cached_value is not None:
+                return cached_value
+            # The entry was evicted while revalidating, so ask again without the validators
+            logger.info("Cached response was evicted, repeating the request unconditionally")
+            for key in validator_headers:
+                request_headers.pop(key, None)
+            response = self.session.request(**request_params)
+            logger.info(f"Status code: {response.status_code}")
+        
+        # Handle streaming responses; error statuses fall through to the checks below
+        if streaming and response.status_code == 200:
             logger.info("Handling streaming response")
-            return response
+            return self._iter_stream(response)
+        
+        logger.info(f"Response size: {len(response.content)} bytes")
         
         # Handle non-streaming responses
         if response.status_code == 200:
             try:
-                response_json = response.json()
+                response_json = self._parse_json(response)
                 logger.info(f"Successfully parsed JSON response")
                 logger.info(f"Response content preview: {str(response.text)[:500]}...")
                 
@@ -110,11 +212,13 @@ class ProxyClient:
                     logger.info(f"Response processing config: {response_processing_config}")
                     if response_processing_config.get("enabled", False):
                         rules = response_processing_config.get("rules", [])
+                        fix_encoding = response_processing_config.get("fix_mojibake", False)
+                        normalize = response_processing_config.get("normalize_unicode", False)
                         logger.info(f"Response processing rules: {rules}")
-                        if rules:
+                        if rules or fix_encoding or normalize:
                             logger.info(f"Applying response processing rules ({len(rules)} rules)")
                             original_response = response_json.copy()
-                            response_json = process_response_with_regex(response_json, rules)
+                            response_json = process_response_with_regex(response_json, rules, fix_encoding, normalize)
                             logger.info(f"Response processing completed")
                 else:
                     logger.info("Response processing config not available or config object missing")
@@ -135,6 +239,8 @@ class ProxyClient:
                         )
                     else:
                         logger.error("Max retries for blank content reached, returning blank response")
+                elif cache_key is not None:
+                    self.cache.store(cache_key, response.headers, response_json)
                 
                 return response_json
             except json.JSONDecodeError as e:
@@ -188,6 +294,92 @@ class ProxyClient:
         
         return response.json()
     
+    @staticmethod
+    def _prepare_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Build outgoing headers from the defaults plus the caller's forwardable headers"""
+        request_headers = {
+            "Content-Type": "application/json",
+            "User-Agent": "SillyTavern-Proxy/1.0"
+        }
+        
+        # Forward headers from SillyTavern (including Authorization/API keys)
+        # But filter out problematic headers that should not be forwarded
+        if headers:
+            for key, value in headers.items():
+                if key.lower() not in SKIP_HEADERS:
+                    request_headers[key] = value
+        return request_headers
+    
+    def _cache_lookup(self, method: str, target_url: str, request_data: Dict[str, Any],
+                      request_params: Dict[str, Any], streaming: bool):
+        """Return (cache key, cached entry) for a request, or (None, None) if it bypasses the cache"""
+        if self.cache is None or streaming:
+            return None, None
+        if method.upper() not in CACHEABLE_METHODS and not self.cache_post:
+            return None, None
+        if not self.cache_authorized and any(key.lower() in SENSITIVE_HEADERS for key in request_params["headers"]):
+            return None, None
+        
+        body = request_params.get("data") or json.dumps(request_data, sort_keys=True).encode()
+        cache_key = ResponseCache.make_key(method, target_url, body)
+        return cache_key, self.cache.get(cache_key)
+    
+    def forward_batch(self, payloads: List[Dict[str, Any]],
+                      headers: Optional[Dict[str, str]] = None,
+                      timeout: Optional[int] = None,
+                      endpoint: str = DEFAULT_BATCH_ENDPOINT) -> List[Any]:
+        """Forward several requests as one batched upstream call
+        
+        Posts {"requests": [...]} to an upstream batch endpoint and returns the
+        entries of its {"responses": [...]} answer, matched to payloads by index.
+        """
+        target_url = urljoin(self.target_url, endpoint)
+        request_params = {
+            "method": "POST",
+            "url": target_url,
+            "headers": self._prepare_headers(headers),
+            "json": {"requests": payloads}
+        }
+        if timeout is not None:
+            request_params["timeout"] = timeout
+        
+        logger.info(f"Forwarding batch of {len(payloads)} requests to: {target_url}")
+        response = self.session.request(**request_params)
+        response.raise_for_status()
+        
+        responses = response.json().get("responses")
+        if not isinstance(responses, list) or len(responses) != len(payloads):
+            raise ValueError(f"Batch response does not match the {len(payloads)} requests sent")
+        return responses
+    
+    def forward_many(self, payloads: List[Dict[str, Any]], **kwargs) -> List[Any]:
+        """Forward several requests concurrently, returning results in payload order
+        
+        Keyword arguments are passed to forward_request for every payload.
+        The first exception raised by any request propagates to the caller.
+        """
+        return list(self._pool.map(lambda payload: self.forward_request(payload, **kwargs), payloads))
+    
+    @staticmethod
+    def _parse_json(response) -> Any:
+        """Parse a response body as JSON, with orjson when it is installed
+        
+        orjson only reads UTF-8, so bodies declaring another charset are
+        decoded by requests instead.
+        """
+        encoding = response.encoding
+        if orjson is not None and (encoding is None or encoding.lower().replace("-", "") == "utf8"):
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError
+            return orjson.loads(response.content)
+        return response.json()
+    
+    @staticmethod
+    def _iter_stream(response) -> Iterator[bytes]:
+        """Yield a streaming response body as it arrives, closing the response when done"""
+        with closing(response):
+            # chunk_size=None yields each chunk as soon as it is received
+            yield from response.iter_content(chunk_size=None)
+    
     def _is_blank_response(self, response_json: Dict[str, Any]) -> bool:
         """Check if the response has blank content that should trigger a retry"""
         try:
@@ -259,3 +451,105 @@ class ProxyClient:
                 error_response["error"]["original_error"] = {"message": response.text}
         
         return error_response
+
+
+class BatchingProxyClient(ProxyClient):
+    """Proxy client that coalesces submitted requests into batched upstream calls
+    
+    Requests passed to submit() are buffered on a background thread and sent
+    through forward_batch once max_batch requests are waiting or window_ms
+    has passed since the first one arrived.
+    """
+    
+    def __init__(self, target_url: str, error_logger=None, config=None,
+                 window_ms: int = 20, max_batch: int = 32,
+                 batch_endpoint: str = DEFAULT_BATCH_ENDPOINT):
+        super().__init__(target_url, error_logger=error_logger, config=config)
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.batch_endpoint = batch_endpoint
+        self._queue = queue.Queue()
+        self._closed = False
+        self._closed_lock = threading.Lock()
+        self._flusher = threading.Thread(target=self._run, name="proxy-client-batcher", daemon=True)
+        self._flusher.start()
+    
+    def submit(self, request_data: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> Future:
+        """Queue a request for the next batch and return a future for its response
+        
+        Raises:
+            RuntimeError: If the client has been closed
+        """
+        future = Future()
+        with self._closed_lock:
+            if self._closed:
+                raise RuntimeError("cannot submit requests after close")
+            self._queue.put((request_data, headers, future))
+        return future
+    
+    def close(self):
+        """Flush pending requests, stop the background thread and release connections"""
+        with self._closed_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._flusher.join()
+        super().close()
+    
+    def _run(self):
+        """Collect queued requests into windows and flush each one"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            stopping = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._flush(batch)
+            except Exception as e:
+                # Fail this batch's callers without stopping the thread for later batches
+                logger.error(f"Flushing batched requests failed: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            if stopping:
+                return
+    
+    def _flush(self, batch: List[tuple]):
+        """Send one batched call per distinct header set and resolve the futures"""
+        groups = {}
+        for request_data, headers, future in batch:
+            # Skip requests whose caller cancelled the future while it was queued
+            if not future.set_running_or_notify_cancel():
+                continue
+            key = tuple(sorted((headers or {}).items()))
+            groups.setdefault(key, []).append((request_data, future))
+        
+        for key, items in groups.items():
+            try:
+                responses = self.forward_batch(
+                    [request_data for request_data, _ in items],
+                    headers=dict(key),
+                    endpoint=self.batch_endpoint
+                )
+            except Exception as e:
+                logger.error(f"Batched request failed: {e}")
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, future), response in zip(items, responses):
+                future.set_result(response)
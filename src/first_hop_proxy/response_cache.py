@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Parse a Cache-Control header into a directive -> argument mapping"""
+    directives = {}
+    if not value:
+        return directives
+    for part in value.split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+class CacheEntry:
+    """Cached parsed response with its freshness deadline and validators"""
+
+    def __init__(self, value: Any, expires_at: float, etag: Optional[str], last_modified: Optional[str]):
+        self.value = value
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def is_fresh(self) -> bool:
+        """Check whether the entry can be served without contacting the upstream"""
+        return time.monotonic() < self.expires_at
+
+    def validator_headers(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating a stale entry"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of upstream responses that honours HTTP caching headers
+
+    Nothing is cached unless the upstream allows it: responses need a positive
+    max-age (or s-maxage) to be served directly, or an ETag/Last-Modified to be
+    revalidated, and no-store/private responses are never kept. Keys do not
+    include request headers, so responses that declare a Vary are not kept either.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(method: str, url: str, body: bytes) -> tuple:
+        """Build a cache key from the method, URL and a hash of the request body"""
+        return (method.upper(), url, hashlib.blake2b(body, digest_size=16).hexdigest())
+
+    def get(self, key: tuple) -> Optional[CacheEntry]:
+        """Return the entry for a key, fresh or stale, marking it recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def store(self, key: tuple, headers: Dict[str, str], value: Any) -> None:
+        """Cache a parsed response if its headers allow it"""
+        directives = parse_cache_control(headers.get("Cache-Control"))
+        if "no-store" in directives or "private" in directives:
+            return
+        # The response depends on request headers the key does not capture
+        if headers.get("Vary"):
+            return
+
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        max_age = 0 if "no-cache" in directives else self._max_age(directives)
+        if max_age <= 0 and not (etag or last_modified):
+            return
+
+        entry = CacheEntry(value, time.monotonic() + max_age, etag, last_modified)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        logger.info(f"Cached upstream response for {max_age}s (key: {key[:2]})")
+
+    def refresh(self, key: tuple, headers: Dict[str, str]) -> Optional[Any]:
+        """Renew a revalidated entry after a 304 and return its cached value"""
+        entry = self.get(key)
+        if entry is None:
+            return None
+        directives = parse_cache_control(headers.get("Cache-Control"))
+        entry.expires_at = time.monotonic() + self._max_age(directives)
+        entry.etag = headers.get("ETag", entry.etag)
+        return entry.value
+
+    @staticmethod
+    def _max_age(directives: Dict[str, Optional[str]]) -> int:
+        """Shared-cache lifetime in seconds, preferring s-maxage over max-age"""
+        for name in ("s-maxage", "max-age"):
+            argument = directives.get(name)
+            if argument and argument.isdigit():
+                return int(argument)
+        return 0
@@ -1,9 +1,44 @@
 """
 Utility functions for the seaking-proxy middleware
 """
+import codecs
+import itertools
+import json
+import logging
 import re
-from typing import Dict, Any, List
-from .constants import SENSITIVE_HEADERS
+import sys
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Any, Callable, List, Optional
+from .constants import (
+    SENSITIVE_HEADERS, PARALLEL_CHOICE_MIN_LENGTH, PARALLEL_CHOICE_WORKERS, REGEX_RESULT_CACHE_SIZE,
+    REGEX_RESULT_CACHE_MAX_LENGTH
+)
+
+try:
+    from re import _parser as _sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse as _sre_parse
+
+try:
+    import re2  # google-re2: linear-time matching, used when installed
+except ImportError:
+    re2 = None
+
+try:
+    import ftfy  # heuristic mojibake repair, used by fix_mojibake when installed
+except ImportError:
+    ftfy = None
+
+try:
+    import ahocorasick  # pyahocorasick: one pass for many literals, used when installed
+except ImportError:
+    ahocorasick = None
+
+logger = logging.getLogger(__name__)
 
 
 def sanitize_headers_for_logging(headers: Dict[str, Any]) -> Dict[str, Any]:
@@ -16,18 +51,24 @@ def sanitize_headers_for_logging(headers: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         Dictionary with sensitive header values obfuscated
     """
-    sanitized = {}
-    
-    for key, value in headers.items():
-        if key.lower() in SENSITIVE_HEADERS:
-            if value and len(str(value)) > 8:
-                # Show first 8 characters + "..." for API keys
-                sanitized[key] = f"{str(value)[:8]}..."
-            else:
-                sanitized[key] = "[REDACTED]"
-        else:
-            sanitized[key] = value
-    return sanitized
+    return {
+        key: _redact_header_value(value) if key.lower() in SENSITIVE_HEADERS else value
+        for key, value in headers.items()
+    }
+
+
+def _redact_header_value(value: Any) -> str:
+    """Show the first 8 characters of an API key, or redact short values entirely"""
+    text = value if isinstance(value, str) else str(value)
+    if value and len(text) > 8:
+        return text[:8] + "..."
+    return "[REDACTED]"
+
+
+# Bound format methods for format_duration
+_MS_FORMAT = "{:.0f}ms".format
+_SECONDS_FORMAT = "{:.2f}s".format
+_MINUTES_FORMAT = "{}m {:.2f}s".format
 
 
 def format_duration(start_time: float, end_time: float) -> str:
@@ -43,13 +84,12 @@ def format_duration(start_time: float, end_time: float) -> str:
     """
     duration = end_time - start_time
     if duration < 1:
-        return f"{duration * 1000:.0f}ms"
+        return _MS_FORMAT(duration * 1000)
     elif duration < 60:
-        return f"{duration:.2f}s"
+        return _SECONDS_FORMAT(duration)
     else:
-        minutes = int(duration // 60)
-        seconds = duration % 60
-        return f"{minutes}m {seconds:.2f}s"
+        minutes, seconds = divmod(duration, 60)
+        return _MINUTES_FORMAT(int(minutes), seconds)
 
 
 def truncate_text(text: str, max_length: int = 500) -> str:
@@ -65,7 +105,7 @@ def truncate_text(text: str, max_length: int = 500) -> str:
     """
     if len(text) <= max_length:
         return text
-    return f"{text[:max_length]}..."
+    return text[:max_length] + "..."
 
 
 def safe_json_dumps(obj: Any, default: str = "Unable to serialize") -> str:
@@ -80,62 +120,647 @@ def safe_json_dumps(obj: Any, default: str = "Unable to serialize") -> str:
         JSON string or default string
     """
     try:
-        import json
         return json.dumps(obj, indent=2, default=str)
     except (TypeError, ValueError):
         return default
 
 
-def apply_regex_replacements(text: str, rules: List[Dict[str, Any]]) -> str:
+def _sloppy_cp1252_errors(error: UnicodeEncodeError) -> tuple:
+    """Encode the five code points cp1252 leaves undefined as their Latin-1 bytes"""
+    text = error.object[error.start:error.end]
+    if all(ord(char) < 0x100 for char in text):
+        return text.encode("latin-1"), error.end
+    raise error
+
+
+codecs.register_error("first_hop_proxy.sloppy_cp1252", _sloppy_cp1252_errors)
+
+
+def fix_mojibake(text: str) -> str:
     """
-    Apply regex replacement rules to text
+    Repair UTF-8 text that was mis-decoded as Windows-1252 (e.g. "â€”" -> "—")
+    
+    Uses ftfy's encoding fixer when installed; its other fixers (quote
+    straightening, HTML unescaping, width folding) would rewrite legitimate
+    content and are not run. Otherwise the text is re-encoded as Windows-1252
+    and decoded as UTF-8, and left unchanged if that round trip fails, which
+    also keeps correctly encoded non-ASCII text intact.
     
     Args:
-        text: Text to apply replacements to
-        rules: List of replacement rules with pattern, replacement, flags, and apply_to
+        text: Text that may contain mojibake
         
     Returns:
-        Text with replacements applied
+        Repaired text
     """
-    if not text or not rules:
+    if not text or text.isascii():
         return text
+    if ftfy is not None:
+        return ftfy.fix_encoding(text)
+    try:
+        return text.encode("cp1252", errors="first_hop_proxy.sloppy_cp1252").decode("utf-8")
+    except UnicodeError:
+        return text
+
+
+def normalize_nfc(text: str) -> str:
+    """
+    Normalize text to Unicode NFC
     
-    result = text
+    ASCII text is already NFC and is returned without a scan; for the rest,
+    unicodedata's quick check returns already-normalized text unchanged.
     
-    for rule in rules:
+    Args:
+        text: Text to normalize
+        
+    Returns:
+        NFC-normalized text
+    """
+    if not text or text.isascii():
+        return text
+    return unicodedata.normalize("NFC", text)
+
+
+# Rule flag letters and the re flags they stand for
+_FLAG_MAP = {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL, "x": re.VERBOSE}
+
+
+def _parse_flags(flags_str: str) -> int:
+    """
+    Convert a rule's flags string (e.g. "im") to re flags
+    
+    Args:
+        flags_str: Any combination of the letters i, m, s and x
+        
+    Returns:
+        Combined re flag value
+    """
+    flags = 0
+    for letter in flags_str:
+        flags |= _FLAG_MAP.get(letter, 0)
+    return flags
+
+
+# Constructs RE2 matches differently from re: its \w, \d, \s and \b are ASCII-only,
+# and its $ does not match before a trailing newline
+_RE2_DIVERGENT = re.compile(r"\\[wWdDsSbB]|\$")
+
+
+@lru_cache(maxsize=1024)
+def _compile(pattern: str, flags_str: str):
+    """
+    Compile a rule pattern once per (pattern, flags) pair
+    
+    Args:
+        pattern: Regex pattern from the rule
+        flags_str: Flags string from the rule
+        
+    Returns:
+        Compiled pattern, or the re.error raised for an invalid pattern so
+        that bad rules are not recompiled for every message
+    """
+    # RE2 takes flags inline and has no verbose mode; patterns it rejects
+    # (backreferences, lookaround) or would match differently fall back to the standard engine
+    if re2 is not None and "x" not in flags_str and not _RE2_DIVERGENT.search(pattern):
+        inline = "".join(flag for flag in "ims" if flag in flags_str)
+        try:
+            return re2.compile(f"(?{inline}){pattern}" if inline else pattern)
+        except re2.error as e:
+            # Compiled once per pattern, so this is logged once rather than per message
+            logger.info(f"Pattern {pattern!r} is not supported by RE2 ({e}), using the re module")
+    try:
+        return re.compile(pattern, _parse_flags(flags_str))
+    except re.error as e:
+        return e
+
+
+# Characters that make a pattern more than a plain literal
+_REGEX_SPECIAL_CHARS = frozenset(".^$*+?{}[]\\|()")
+
+
+def _fusable_literal(pattern: Any, replacement: Any, flags_str: Any) -> bool:
+    """
+    Check whether a rule is a plain literal swap that may join a fused group
+    
+    Args:
+        pattern: Pattern from the rule
+        replacement: Replacement from the rule
+        flags_str: Flags string from the rule
+        
+    Returns:
+        True if neither the pattern nor the replacement uses regex syntax
+    """
+    if not (isinstance(pattern, str) and isinstance(replacement, str) and isinstance(flags_str, str)):
+        return False
+    if "x" in flags_str or "\\" in replacement or _REGEX_SPECIAL_CHARS.intersection(pattern):
+        return False
+    # str.lower only matches re's case folding for ASCII; non-ASCII literals or
+    # replacements (long s, Kelvin sign) can fold onto ASCII ones
+    return "i" not in flags_str or (pattern.isascii() and replacement.isascii())
+
+
+def _literals_overlap(first: str, second: str) -> bool:
+    """Check whether two literals could share characters of a single match"""
+    if first in second or second in first:
+        return True
+    for size in range(1, min(len(first), len(second))):
+        if first[-size:] == second[:size] or second[-size:] == first[:size]:
+            return True
+    return False
+
+
+def _can_fuse(group: List[tuple], literal: str, ignore_case: bool) -> bool:
+    """
+    Check that appending a literal to a fused group keeps sequential semantics
+    
+    Applying the group in one pass only matches applying its rules one after
+    another when no two literals can overlap and no earlier replacement can
+    create or split a match for the new literal.
+    
+    Args:
+        group: (literal, replacement) pairs already in the group, in rule order
+        literal: Literal pattern of the next rule
+        ignore_case: Whether the group matches case-insensitively
+        
+    Returns:
+        True if the rule can join the group
+    """
+    fold = str.lower if ignore_case else str
+    literal = fold(literal)
+    for earlier_literal, earlier_replacement in group:
+        if not earlier_replacement or set(fold(earlier_replacement)) & set(literal):
+            return False
+        if _literals_overlap(fold(earlier_literal), literal):
+            return False
+    return True
+
+
+def _compile_replacement(compiled: Any, replacement: Any) -> Any:
+    """
+    Parse a backreference template once instead of on every sub() call
+    
+    Args:
+        compiled: Compiled pattern the replacement is used with
+        replacement: Replacement from the rule
+        
+    Returns:
+        A literal string or a match callback equivalent to the template; the
+        replacement itself when it has no escapes or cannot be pre-parsed
+        
+    Raises:
+        TypeError: If the replacement is not a string
+        re.error: If the template references a group the pattern lacks
+    """
+    if not isinstance(replacement, str):
+        raise TypeError(f"replacement must be a string, not {type(replacement).__name__}")
+    # Templates without backslashes are already substituted as literals by sub()
+    if "\\" not in replacement:
+        return replacement
+    # re._subx is the helper sub() uses to parse templates up to Python 3.11;
+    # newer versions keep the parsed template cached inside the engine
+    if isinstance(compiled, re.Pattern) and hasattr(re, "_subx"):
+        parsed = re._subx(compiled, replacement)
+        if isinstance(parsed, str):
+            # A template without group references comes back already expanded; sub() would
+            # parse its backslashes again, so it is returned from a callback instead
+            return lambda match, literal=parsed: literal
+        return parsed
+    # sub() parses the template before searching, so this surfaces bad group references now
+    compiled.sub(replacement, "")
+    return replacement
+
+
+def validate_regex_rule(pattern: str, replacement: str = "", flags_str: str = "") -> None:
+    """
+    Check that a rule's pattern and replacement template are valid
+    
+    The pattern and replacement are prepared the same way _build_ruleset
+    prepares a regex pass, and that exact replacement is run through subn(),
+    so a rule that passes cannot raise when it is applied.
+    
+    Args:
+        pattern: Regex pattern from the rule
+        replacement: Replacement from the rule
+        flags_str: Flags string from the rule
+        
+    Raises:
+        re.error: If the pattern or the replacement template is invalid
+    """
+    compiled = _compile(pattern, flags_str)
+    if isinstance(compiled, re.error):
+        raise re.error(compiled.msg, compiled.pattern, compiled.pos)
+    compiled.subn(_compile_replacement(compiled, replacement), "")
+
+
+def _required_prefix(pattern: str, flags_str: str):
+    """
+    Find the literal text every match of a pattern must start with
+    
+    Args:
+        pattern: Regex pattern from the rule
+        flags_str: Flags string from the rule
+        
+    Returns:
+        (prefix, ignore_case), or None when the pattern has no literal prefix
+    """
+    try:
+        parsed = _sre_parse.parse(pattern, _parse_flags(flags_str))
+    except Exception:
+        return None
+    prefix = []
+    for opcode, argument in parsed:
+        if opcode != _sre_parse.LITERAL:
+            break
+        prefix.append(chr(argument))
+    if not prefix:
+        return None
+    return "".join(prefix), bool(parsed.state.flags & re.IGNORECASE)
+
+
+def _literal_prefilter(literals: List[str], ignore_case: bool):
+    """
+    Build the substring check that lets a pass skip text it cannot match
+    
+    Args:
+        literals: Literal patterns matched by the pass
+        ignore_case: Whether the pass matches case-insensitively
+        
+    Returns:
+        (literals, ignore_case) with literals lowercased for case-insensitive
+        passes, or None when a substring check is not reliable
+    """
+    if ignore_case:
+        # Only ASCII literals lowercase the same way the regex engine folds them
+        if not all(literal.isascii() for literal in literals):
+            return None
+        return tuple(literal.lower() for literal in literals), True
+    return tuple(literals), False
+
+
+class _Literal:
+    """Stand-in for a compiled pattern that swaps a case-sensitive literal with str.replace"""
+    
+    def __init__(self, needle: str):
+        self.needle = needle
+    
+    def subn(self, replacement: str, string: str) -> tuple:
+        count = string.count(self.needle)
+        if not count:
+            return string, 0
+        return string.replace(self.needle, replacement), count
+
+
+class _LiteralAutomaton:
+    """Stand-in for a compiled pattern that swaps several case-sensitive literals in one Aho-Corasick pass"""
+    
+    def __init__(self, group: List[tuple]):
+        self.automaton = ahocorasick.Automaton()
+        for literal, replacement in group:
+            self.automaton.add_word(literal, (len(literal), replacement))
+        self.automaton.make_automaton()
+    
+    def subn(self, replacement: Any, string: str) -> tuple:
+        # Fused literals never overlap each other, so the only overlapping hits are
+        # repeats of one literal; skipping those keeps re's leftmost, non-overlapping matches
+        pieces = []
+        position = 0
+        for end, (length, value) in self.automaton.iter(string):
+            start = end - length + 1
+            if start < position:
+                continue
+            pieces.append(string[position:start])
+            pieces.append(value)
+            position = end + 1
+        if not pieces:
+            return string, 0
+        pieces.append(string[position:])
+        return "".join(pieces), len(pieces) // 2
+
+
+class _CharTable:
+    """Stand-in for a compiled pattern that swaps single characters with str.translate"""
+    
+    def __init__(self, table: Dict[int, str]):
+        self.table = table
+    
+    def subn(self, replacement: Any, string: str) -> tuple:
+        result = string.translate(self.table)
+        if result == string:
+            return string, 0
+        return result, 1
+
+
+def _fused_replacer(replacements: List[str]):
+    """Build a sub() callback that returns the replacement for the matched alternative"""
+    return lambda match: replacements[match.lastindex - 1]
+
+
+# Separator for processing several texts as one string; see CompiledRules.joinable
+_JOIN_SENTINEL = "\x00"
+
+
+class CompiledRules(tuple):
+    """Compiled passes for a list of rules, accepted by apply_regex_replacements in place of the rules
+    
+    When every pass starts with required literal text, triggers holds the
+    characters a match can start with and ignore_case whether any of them were
+    case-folded, so text containing none of them can skip all passes at once.
+    ruleset_id is unique per instance and keys the cached results; it is None
+    for rulesets that were not interned by _build_ruleset's cache, which are
+    rebuilt on every call and bypass the result cache. joinable
+    is set when every pass swaps a literal, so several texts can be processed
+    as one string joined with _JOIN_SENTINEL.
+    """
+    
+    _ids = itertools.count()
+    
+    def __new__(cls, passes=()):
+        self = super().__new__(cls, passes)
+        self.ruleset_id = next(cls._ids)
+        self.joinable = False
+        self.triggers = set()
+        self.ignore_case = False
+        for _, _, _, prefilter in self:
+            if prefilter is None:
+                self.triggers = None
+                break
+            literals, ignore_case = prefilter
+            for literal in literals:
+                self.triggers.add(literal[0])
+                if ignore_case:
+                    self.triggers.add(literal[0].upper())
+            self.ignore_case = self.ignore_case or ignore_case
+        return self
+
+
+@lru_cache(maxsize=256)
+def _build_ruleset(rule_keys: tuple) -> CompiledRules:
+    """
+    Compile a ruleset into the passes apply_regex_replacements runs
+    
+    Consecutive plain literal rules that cannot interfere with each other are
+    fused into a single alternation so the text is scanned once for all of
+    them, or a str.translate table when they all swap single characters.
+    Case-sensitive groups use an Aho-Corasick automaton when pyahocorasick
+    is installed.
+    A lone case-sensitive literal is swapped with str.replace. Every other
+    rule gets its own pass, in the original order.
+    
+    Args:
+        rule_keys: (pattern, replacement, flags) for each rule
+        
+    Returns:
+        CompiledRules holding the (compiled pattern, replacement, rule, prefilter)
+        passes, with its triggers and joinable attributes set
+    """
+    passes = []
+    group = []
+    group_ignore_case = False
+    literal_only = True
+    
+    def flush():
+        if len(group) == 1 and not group_ignore_case:
+            # str.replace finds the literal without the regex engine
+            literal, replacement = group[0]
+            passes.append((_Literal(literal), replacement, group[0], _literal_prefilter([literal], False)))
+        elif len(group) == 1:
+            literal, replacement = group[0]
+            passes.append((_compile(literal, "i" if group_ignore_case else ""), replacement, group[0],
+                           _literal_prefilter([literal], group_ignore_case)))
+        elif group and not group_ignore_case and all(len(literal) == 1 for literal, _ in group):
+            # Single-character swaps need no regex at all
+            table = {ord(literal): replacement for literal, replacement in group}
+            passes.append((_CharTable(table), None, tuple(group),
+                           _literal_prefilter([literal for literal, _ in group], False)))
+        elif group and not group_ignore_case and ahocorasick is not None:
+            passes.append((_LiteralAutomaton(group), None, tuple(group),
+                           _literal_prefilter([literal for literal, _ in group], False)))
+        elif group:
+            fused = "|".join(f"({re.escape(literal)})" for literal, _ in group)
+            compiled = re.compile(fused, re.IGNORECASE if group_ignore_case else 0)
+            replacements = [replacement for _, replacement in group]
+            passes.append((compiled, _fused_replacer(replacements), tuple(group),
+                           _literal_prefilter([literal for literal, _ in group], group_ignore_case)))
+        group.clear()
+    
+    for rule in rule_keys:
+        pattern, replacement, flags_str = rule
         try:
-            pattern = rule.get("pattern")
-            replacement = rule.get("replacement", "")
-            flags_str = rule.get("flags", "")
-            apply_to = rule.get("apply_to", "all")
-            
             if not pattern:
                 continue
             
-            # Convert flags string to re flags
-            flags = 0
-            if "i" in flags_str:
-                flags |= re.IGNORECASE
-            if "m" in flags_str:
-                flags |= re.MULTILINE
-            if "s" in flags_str:
-                flags |= re.DOTALL
-            if "x" in flags_str:
-                flags |= re.VERBOSE
+            if _fusable_literal(pattern, replacement, flags_str):
+                ignore_case = "i" in flags_str
+                if group and (ignore_case != group_ignore_case or not _can_fuse(group, pattern, ignore_case)):
+                    flush()
+                group_ignore_case = ignore_case
+                group.append((pattern, replacement))
+                continue
             
-            # Apply the replacement
-            result = re.sub(pattern, replacement, result, flags=flags)
+            flush()
+            if "x" in flags_str or _REGEX_SPECIAL_CHARS.intersection(pattern):
+                literal_only = False
+            compiled = _compile(pattern, flags_str)
+            if isinstance(compiled, re.error):
+                logger.warning(f"Invalid regex rule: {rule}, error: {compiled}")
+                continue
+            # Skip the regex when the literal text every match starts with is absent
+            prefilter = None
+            required = _required_prefix(pattern, flags_str)
+            if required is not None:
+                prefix, ignore_case = required
+                prefilter = _literal_prefilter([prefix], ignore_case)
+            passes.append((compiled, _compile_replacement(compiled, replacement), rule, prefilter))
             
         except (re.error, TypeError, ValueError) as e:
             # Log error but continue with other rules
-            import logging
-            logger = logging.getLogger(__name__)
             logger.warning(f"Invalid regex rule: {rule}, error: {e}")
             continue
     
+    flush()
+    compiled_rules = CompiledRules(passes)
+    # A literal without the sentinel can never match across a join boundary
+    compiled_rules.joinable = literal_only and not any(
+        isinstance(pattern, str) and _JOIN_SENTINEL in pattern for pattern, _, _ in rule_keys
+    )
+    return compiled_rules
+
+
+def _compile_ruleset(rules: List[Dict[str, Any]]) -> CompiledRules:
+    """
+    Return the cached compiled passes for a list of rules
+    
+    Callers that apply the same rules to many texts can compile them once
+    and pass the result to apply_regex_replacements.
+    
+    Args:
+        rules: List of replacement rules, or rules that are already compiled
+        
+    Returns:
+        CompiledRules holding the (compiled pattern, replacement, rule, prefilter) passes
+    """
+    if isinstance(rules, CompiledRules):
+        return rules
+    rule_keys = tuple(
+        (rule.get("pattern"), rule.get("replacement", ""), rule.get("flags", ""))
+        for rule in rules
+    )
+    try:
+        return _build_ruleset(rule_keys)
+    except TypeError:
+        # Unhashable rule fields cannot be cached, so build the passes directly; a
+        # fresh ruleset per call would only fill the result cache with dead entries
+        compiled_rules = _build_ruleset.__wrapped__(rule_keys)
+        compiled_rules.ruleset_id = None
+        return compiled_rules
+
+
+# LRU of (ruleset_id, text) -> result; _UNCHANGED marks texts no rule changed,
+# so callers still get their own object back
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
+_UNCHANGED = object()
+
+
+def apply_regex_replacements(text: str, rules: List[Dict[str, Any]]) -> str:
+    """
+    Apply regex replacement rules to text
+    
+    Args:
+        text: Text to apply replacements to
+        rules: List of replacement rules with pattern, replacement, flags, and apply_to,
+            or the CompiledRules returned by _compile_ruleset
+        
+    Returns:
+        Text with replacements applied, or the same text object if no rule matched
+    """
+    if not text or not rules:
+        return text
+    
+    compiled_rules = _compile_ruleset(rules)
+    result = _known_result(text, compiled_rules)
+    if result is None:
+        result = _apply_passes(text, compiled_rules)
+        _store_result(text, compiled_rules, result)
     return result
 
 
+def _known_result(text: str, compiled_rules: CompiledRules) -> Optional[str]:
+    """
+    Return the result for text without running the passes, when it is known
+    
+    Args:
+        text: Text to apply replacements to
+        compiled_rules: Rules from _compile_ruleset
+        
+    Returns:
+        The text itself when no pass can match it, the cached result for
+        resent text, or None when the passes have to run
+    """
+    if not text or not compiled_rules:
+        return text
+    # Most texts contain nothing to fix: when the rules are all literals and no
+    # literal's first character occurs, skip every pass after one scan
+    triggers = compiled_rules.triggers
+    if triggers is not None and (text.isascii() or not compiled_rules.ignore_case):
+        if not any(trigger in text for trigger in triggers):
+            return text
+    
+    if len(text) > REGEX_RESULT_CACHE_MAX_LENGTH or compiled_rules.ruleset_id is None:
+        return None
+    
+    # Resent content (system prompts, conversation history) reuses the earlier result
+    key = (compiled_rules.ruleset_id, text)
+    with _result_cache_lock:
+        cached = _result_cache.get(key)
+        if cached is None:
+            return None
+        _result_cache.move_to_end(key)
+    return text if cached is _UNCHANGED else cached
+
+
+def _store_result(text: str, compiled_rules: CompiledRules, result: str) -> None:
+    """Cache the result of running the passes over text, unless the text is too long to keep"""
+    if len(text) > REGEX_RESULT_CACHE_MAX_LENGTH or compiled_rules.ruleset_id is None:
+        return
+    key = (compiled_rules.ruleset_id, text)
+    with _result_cache_lock:
+        _result_cache[key] = _UNCHANGED if result is text else result
+        if len(_result_cache) > REGEX_RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+
+
+def _apply_passes(text: str, compiled_rules: CompiledRules) -> str:
+    """Run each compiled pass over the text in order"""
+    result = text
+    # Lowercased text for case-insensitive prefilters, rebuilt after a replacement changes it
+    lowered = None
+    
+    # Invalid patterns, templates and replacements were dropped when the
+    # ruleset was built, so the passes run without a per-rule error guard
+    for compiled, replacement, rule, prefilter in compiled_rules:
+        # Skip literal passes whose literals do not occur in the text
+        if prefilter is not None:
+            literals, ignore_case = prefilter
+            haystack = result
+            if ignore_case:
+                # Non-ASCII text can fold onto ASCII literals (dotless i matches "i"), so only
+                # ASCII text is checked and everything else goes to the regex engine
+                if result.isascii():
+                    if lowered is None:
+                        lowered = result.lower()
+                    haystack = lowered
+                else:
+                    haystack = None
+            if haystack is not None and not any(literal in haystack for literal in literals):
+                continue
+        
+        # Apply the replacement, keeping the original object when nothing matched
+        replaced, count = compiled.subn(replacement, result)
+        if count:
+            result = replaced
+            lowered = None
+    
+    return result
+
+
+def _apply_to_contents(contents: List[str], compiled_rules: CompiledRules) -> List[str]:
+    """
+    Apply compiled rules to several texts, as one joined string when that is safe
+    
+    Texts with a known result are served from the result cache first. Joining
+    the rest saves a run of every pass per text. It is only used for rules made
+    entirely of literal swaps, which cannot match across the sentinel, and the
+    split is checked so a replacement that inserts the sentinel falls back to
+    processing each text on its own. Results are cached per text, since the
+    joined string is unique to its request and would never be looked up again.
+    
+    Args:
+        contents: Texts to process
+        compiled_rules: Rules from _compile_ruleset
+        
+    Returns:
+        Processed texts in the same order
+    """
+    results = [_known_result(content, compiled_rules) for content in contents]
+    misses = [i for i, result in enumerate(results) if result is None]
+    
+    if (len(misses) > 1 and compiled_rules.joinable
+            and not any(_JOIN_SENTINEL in contents[i] for i in misses)):
+        joined = _JOIN_SENTINEL.join(contents[i] for i in misses)
+        parts = _apply_passes(joined, compiled_rules).split(_JOIN_SENTINEL)
+        if len(parts) == len(misses):
+            for i, part in zip(misses, parts):
+                content = contents[i]
+                results[i] = content if part == content else part
+                _store_result(content, compiled_rules, results[i])
+            return results
+    
+    for i in misses:
+        results[i] = _apply_passes(contents[i], compiled_rules)
+        _store_result(contents[i], compiled_rules, results[i])
+    return results
+
+
 def process_messages_with_regex(messages: List[Dict[str, Any]], rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Process messages with regex replacement rules
@@ -145,99 +770,176 @@ def process_messages_with_regex(messages: List[Dict[str, Any]], rules: List[Dict
         rules: List of replacement rules
         
     Returns:
-        List of messages with replacements applied
+        List of messages with replacements applied; messages whose content is
+        unchanged are passed through, and the input list is returned if none changed
     """
     if not messages or not rules:
         return messages
     
-    import logging
-    logger = logging.getLogger(__name__)
     logger.info(f"=== OUTGOING REGEX PROCESSING ===")
     logger.info(f"Applying {len(rules)} rules to {len(messages)} messages")
     logger.info(f"TEST LOG MESSAGE - OUTGOING REGEX PROCESSING IS WORKING")
     
-    processed_messages = []
+    # Compiled rules applicable to each role, built once per role rather than per message
+    # The original rule order is kept, since later rules may depend on earlier ones
+    rules_by_role = {}
+    # Positions of the messages with text content to process, grouped by role
+    indexes_by_role = {}
     
     for i, message in enumerate(messages):
-        role = message.get("role", "").lower()
         content = message.get("content", "")
+        # Content that is not a string (e.g. a list of multimodal parts) is passed through
+        if not content or not isinstance(content, str):
+            continue
         
-        if not content:
+        role = message.get("role", "").lower()
+        if role not in rules_by_role:
+            rules_by_role[role] = _compile_ruleset([
+                rule for rule in rules
+                if rule.get("apply_to", "all").lower() in ("all", role)
+            ])
+        if rules_by_role[role]:
+            indexes_by_role.setdefault(role, []).append(i)
+    
+    # Apply regex replacements
+    processed_contents = {}
+    for role, indexes in indexes_by_role.items():
+        contents = [messages[i]["content"] for i in indexes]
+        processed_contents.update(zip(indexes, _apply_to_contents(contents, rules_by_role[role])))
+    
+    processed_messages = []
+    changed = False
+    # Content previews are only sliced and formatted when they will be logged
+    log_content = logger.isEnabledFor(logging.INFO)
+    
+    for i, message in enumerate(messages):
+        processed_content = processed_contents.get(i)
+        if processed_content is None:
             processed_messages.append(message)
             continue
         
-        # Filter rules based on apply_to
-        applicable_rules = []
-        for rule in rules:
-            apply_to = rule.get("apply_to", "all").lower()
-            if apply_to == "all" or apply_to == role:
-                applicable_rules.append(rule)
-        
-        # Log before processing
-        logger.info(f"Message {i+1} ({role}) BEFORE regex: {content[:200]}...")
+        content = message["content"]
+        if log_content:
+            role = message.get("role", "").lower()
+            logger.info(f"Message {i+1} ({role}) BEFORE regex: {content[:200]}...")
+            logger.info(f"Message {i+1} ({role}) AFTER regex: {processed_content[:200]}...")
         
-        # Apply regex replacements
-        processed_content = apply_regex_replacements(content, applicable_rules)
-        
-        # Log after processing
-        logger.info(f"Message {i+1} ({role}) AFTER regex: {processed_content[:200]}...")
+        if processed_content == content:
+            processed_messages.append(message)
+            continue
         
-        # Create new message with processed content
-        processed_message = message.copy()
-        processed_message["content"] = processed_content
-        processed_messages.append(processed_message)
+        # Shallow clone with the new content; other fields are shared, never deep-copied
+        processed_messages.append(dict(message, content=processed_content))
+        changed = True
     
     logger.info(f"=== OUTGOING REGEX PROCESSING COMPLETE ===")
-    return processed_messages
+    return processed_messages if changed else messages
+
 
+# True unless running on a free-threaded build with the GIL disabled
+_gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)
 
-def process_response_with_regex(response_data: Dict[str, Any], rules: List[Dict[str, Any]]) -> Dict[str, Any]:
+_choice_pool = None
+_choice_pool_lock = threading.Lock()
+
+
+def _map_choices(func: Callable[[str], str], contents: List[str]) -> List[str]:
+    """
+    Apply func to each choice's content, in parallel when that can pay off
+    
+    Regex matching holds the GIL, so threads only overlap on free-threaded
+    builds; elsewhere, and for short or single choices, this stays sequential.
+    
+    Args:
+        func: Processing applied to one content string
+        contents: Content of each choice
+        
+    Returns:
+        Processed content in the same order
+    """
+    global _choice_pool
+    if (len(contents) < 2 or _gil_enabled()
+            or not any(len(content) >= PARALLEL_CHOICE_MIN_LENGTH for content in contents)):
+        return [func(content) for content in contents]
+    with _choice_pool_lock:
+        if _choice_pool is None:
+            _choice_pool = ThreadPoolExecutor(max_workers=PARALLEL_CHOICE_WORKERS,
+                                              thread_name_prefix="regex-choices")
+    return list(_choice_pool.map(func, contents))
+
+
+def _choice_content(choice: Any) -> Optional[str]:
+    """Return a choice's message content, or None if it has no string content"""
+    message = choice.get('message') if isinstance(choice, dict) else None
+    if isinstance(message, dict) and isinstance(message.get('content'), str):
+        return message['content']
+    return None
+
+
+def process_response_with_regex(response_data: Dict[str, Any], rules: List[Dict[str, Any]],
+                                fix_encoding: bool = False, normalize: bool = False) -> Dict[str, Any]:
     """
     Process response data with regex replacement rules
     
     Args:
         response_data: Response dictionary (typically OpenAI format)
         rules: List of replacement rules
+        fix_encoding: Repair mojibake with fix_mojibake before applying the rules
+        normalize: Normalize the content to NFC once, after the rules
         
     Returns:
-        Response data with replacements applied
+        Response data with replacements applied; only the choices and messages
+        whose content changed are copied, and the input is returned if none did
     """
-    if not response_data or not rules:
+    if not response_data or not (rules or fix_encoding or normalize):
         return response_data
     
-    import logging
-    logger = logging.getLogger(__name__)
     logger.info(f"=== INCOMING REGEX PROCESSING ===")
     logger.info(f"Applying {len(rules)} rules to response")
     logger.info(f"TEST LOG MESSAGE - INCOMING REGEX PROCESSING IS WORKING")
     
-    # Create a copy to avoid modifying the original
-    processed_response = response_data.copy()
+    # Compile once for all choices
+    compiled_rules = _compile_ruleset(rules)
+    
+    processed_response = response_data
+    
+    def process_content(content: str) -> str:
+        if fix_encoding:
+            content = fix_mojibake(content)
+        content = apply_regex_replacements(content, compiled_rules)
+        if normalize:
+            content = normalize_nfc(content)
+        return content
     
     # Process choices if they exist
-    if 'choices' in processed_response and isinstance(processed_response['choices'], list):
+    if 'choices' in response_data and isinstance(response_data['choices'], list):
+        choices = response_data['choices']
+        contents = [_choice_content(choice) for choice in choices]
+        processed_contents = iter(_map_choices(
+            process_content, [content for content in contents if content is not None]
+        ))
+        
         processed_choices = []
-        for i, choice in enumerate(processed_response['choices']):
-            processed_choice = choice.copy()
-            
+        changed = False
+        # Content previews are only sliced and formatted when they will be logged
+        log_content = logger.isEnabledFor(logging.INFO)
+        for i, (choice, content) in enumerate(zip(choices, contents)):
             # Process message content if it exists
-            if 'message' in processed_choice and isinstance(processed_choice['message'], dict):
-                message = processed_choice['message'].copy()
-                if 'content' in message and isinstance(message['content'], str):
-                    # Log before processing
-                    logger.info(f"Choice {i+1} BEFORE regex: {message['content'][:200]}...")
-                    
-                    # Apply regex replacements to content
-                    processed_content = apply_regex_replacements(message['content'], rules)
-                    message['content'] = processed_content
-                    
-                    # Log after processing
+            if content is not None:
+                processed_content = next(processed_contents)
+                if log_content:
+                    logger.info(f"Choice {i+1} BEFORE regex: {content[:200]}...")
                     logger.info(f"Choice {i+1} AFTER regex: {processed_content[:200]}...")
-                processed_choice['message'] = message
+                
+                # Copy only the choices that changed, so the original is never modified
+                if processed_content is not content:
+                    choice = dict(choice, message=dict(choice['message'], content=processed_content))
+                    changed = True
             
-            processed_choices.append(processed_choice)
+            processed_choices.append(choice)
         
-        processed_response['choices'] = processed_choices
+        if changed:
+            processed_response = dict(response_data, choices=processed_choices)
     
     logger.info(f"=== INCOMING REGEX PROCESSING COMPLETE ===")
     return processed_response
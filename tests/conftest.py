@@ -1,10 +1,31 @@
 import pytest
 import os
-import sys
 from unittest.mock import patch
 
-# Add src directory to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+def pytest_addoption(parser):
+    """Register command line options for the test suite"""
+    parser.addoption(
+        "--run-network", action="store_true", default=False,
+        help="let tests marked 'network' reach the real ProxyClient instead of a stub"
+    )
+
+@pytest.fixture(scope="session")
+def app():
+    """Flask application configured for testing once per session"""
+    from first_hop_proxy.main import app
+    app.config['TESTING'] = True
+    return app
+
+@pytest.fixture(scope="session")
+def client(app):
+    """Flask test client shared by every test in the session"""
+    with app.test_client() as c:
+        yield c
+
+@pytest.fixture(scope="session")
+def big_string():
+    """1MB message content, allocated once and shared by the large payload tests"""
+    return "x" * 1000000
 
 @pytest.fixture(autouse=True)
 def test_environment():
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+
+httpx = pytest.importorskip("httpx")
+
+from first_hop_proxy.async_proxy_client import AsyncProxyClient
+
+
+def _json_response(payload, status_code=200):
+    """Build an httpx response bound to a request so raise_for_status works"""
+    request = httpx.Request("POST", "https://test-proxy.example.com/chat/completions")
+    return httpx.Response(status_code, json=payload, request=request)
+
+
+class TestAsyncProxyClient:
+    """Test suite for the HTTP/2 async proxy client"""
+
+    def test_forward_request_success(self):
+        """Test async forwarding returns the parsed JSON response"""
+        async def run():
+            async with AsyncProxyClient("https://test-proxy.example.com", http2=False) as client:
+                with patch.object(httpx.AsyncClient, 'request', new=AsyncMock(return_value=_json_response({"choices": []}))) as mock_request:
+                    result = await client.forward_request({"messages": []}, headers={"Authorization": "Bearer token"})
+                    return result, mock_request.call_args
+
+        result, call_args = asyncio.run(run())
+        assert result == {"choices": []}
+        assert call_args[0][1] == "https://test-proxy.example.com/chat/completions"
+        assert call_args[1]["headers"]["Authorization"] == "Bearer token"
+
+    def test_forward_request_http_error(self):
+        """Test async forwarding raises on non-2xx responses"""
+        async def run():
+            async with AsyncProxyClient("https://test-proxy.example.com", http2=False) as client:
+                with patch.object(httpx.AsyncClient, 'request', new=AsyncMock(return_value=_json_response({}, 502))):
+                    await client.forward_request({"messages": []})
+
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(run())
+
+    def test_forward_many_preserves_order(self):
+        """Test concurrent async forwarding returns results in payload order"""
+        responses = [_json_response({"id": i}) for i in range(3)]
+
+        async def run():
+            async with AsyncProxyClient("https://test-proxy.example.com", http2=False) as client:
+                with patch.object(httpx.AsyncClient, 'request', new=AsyncMock(side_effect=responses)):
+                    return await client.forward_many([{"messages": []}] * 3)
+
+        assert asyncio.run(run()) == [{"id": 0}, {"id": 1}, {"id": 2}]
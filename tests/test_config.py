@@ -3,10 +3,6 @@ import yaml
 import os
 import tempfile
 from unittest.mock import Mock, patch, mock_open
-import sys
-
-# Add parent directory to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
 
 # Import the config module
 from first_hop_proxy.config import Config
@@ -172,6 +168,19 @@ class TestConfig:
         #     config.validate()
         assert True  # Placeholder
 
+    @pytest.mark.parametrize("section", ["regex_replacement", "response_processing"])
+    @pytest.mark.parametrize("rule,message", [
+        ({"pattern": "[invalid", "replacement": "x"}, "unterminated character set"),
+        ({"pattern": "hello", "replacement": "\\1"}, "invalid group reference"),
+    ], ids=["invalid_pattern", "invalid_template"])
+    def test_validate_rejects_invalid_regex_rules(self, sample_config, section, rule, message):
+        """Test invalid regex rules are rejected when the config is validated"""
+        config = Config()
+        config._config = sample_config
+        sample_config[section] = {"enabled": True, "rules": [rule]}
+        with pytest.raises(ValueError, match=f"{section}.rules\\[0\\] is not a valid regex rule: {message}"):
+            config.validate()
+
     def test_validate_config_missing_target_url(self, sample_config):
         """Test validation with missing target proxy URL"""
         invalid_config = sample_config.copy()
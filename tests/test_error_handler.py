@@ -3,11 +3,6 @@ import time
 from unittest.mock import Mock, patch, MagicMock
 import requests
 from requests.exceptions import RequestException, Timeout, ConnectionError, HTTPError
-import sys
-import os
-
-# Add src directory to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
 
 # Import the error handler
 from first_hop_proxy.error_handler import ErrorHandler
@@ -3,10 +3,6 @@ import os
 import tempfile
 import json
 from unittest.mock import Mock, patch
-import sys
-
-# Add parent directory to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
 
 # Import the error logger
 from first_hop_proxy.error_logger import ErrorLogger
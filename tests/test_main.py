@@ -1,61 +1,243 @@
+import importlib
 import pytest
 import json
-from unittest.mock import Mock, patch
-from flask import Flask
-import sys
+import logging
 import os
+import threading
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from unittest.mock import MagicMock, create_autospec
+from requests import Response
+from requests.exceptions import HTTPError
+from werkzeug.test import EnvironBuilder
 
-# Add src directory to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+try:
+    import psutil
+except ImportError:
+    psutil = None
 
 # Import the main application
 from first_hop_proxy.main import app
+from first_hop_proxy.config import Config
+from first_hop_proxy.constants import DEFAULT_MODELS
+from first_hop_proxy.error_handler import ErrorHandler
+from first_hop_proxy.proxy_client import ProxyClient
+
+# The package re-exports a main() function under the same name as this module
+main_module = importlib.import_module("first_hop_proxy.main")
+
+# Every test here runs against the session-wide testing app from conftest.py
+pytestmark = pytest.mark.usefixtures("app")
+
+_TARGET_PROXY_URL = "https://test-proxy.example.com/proxy/google-ai/chat/completions"
+_MODELS_URL = "https://test-proxy.example.com/proxy/google-ai/models"
+_AUTH_HEADERS = {"Authorization": "Bearer test-token"}
+
+# Number of requests issued by the memory-under-load test
+_LOAD_REQUEST_COUNT = 10
+
+# Sample OpenAI-compatible chat completion requests (read-only), serialized once for reuse
+_SAMPLE_CHAT_REQUEST = MappingProxyType({
+    "model": "gpt-3.5-turbo",
+    "messages": (
+        MappingProxyType({"role": "user", "content": "Hello, how are you?"}),
+    ),
+    "temperature": 0.7,
+    "max_tokens": 100,
+    "stream": False
+})
+_SAMPLE_STREAMING_REQUEST = MappingProxyType(dict(_SAMPLE_CHAT_REQUEST, stream=True))
+
+
+def _encode_request(request_data):
+    """Serialize a read-only sample request to JSON bytes"""
+    return json.dumps(request_data, default=dict).encode()
+
+
+_SAMPLE_BODY = _encode_request(_SAMPLE_CHAT_REQUEST)
+_SAMPLE_STREAM_BODY = _encode_request(_SAMPLE_STREAMING_REQUEST)
+
+# Canned target proxy responses shared by the patched tests
+_HTTP_404 = Response()
+_HTTP_404.status_code = 404
+_HTTP_404._content = b'{"error": "Not found"}'
+_HTTP_ERROR = HTTPError("404 Client Error", response=_HTTP_404)
+
+_MODELS_RESPONSE = MappingProxyType({
+    "object": "list",
+    "data": (
+        {"id": "test-model", "object": "model"},
+    )
+})
+# Body /models returns when the target proxy cannot be reached
+_EXPECTED_DEFAULT = {"object": "list", "data": DEFAULT_MODELS}
+_DEFAULT_CHAT_RESPONSE = {
+    "choices": [{
+        "message": {
+            "role": "assistant",
+            "content": "Hello! I'm doing well, thank you for asking."
+        },
+        "finish_reason": "stop",
+        "index": 0
+    }],
+    "model": "gpt-3.5-turbo",
+    "object": "chat.completion",
+    "usage": {
+        "prompt_tokens": 10,
+        "completion_tokens": 15,
+        "total_tokens": 25
+    }
+}
+
+
+def _target_proxy_config(self):
+    """Stand-in for Config.get_target_proxy_config pointing at the test proxy"""
+    return {"url": _TARGET_PROXY_URL}
+
+
+@pytest.fixture
+def target_proxy(monkeypatch):
+    """Point the app's target proxy configuration at the test proxy URL"""
+    monkeypatch.setattr(Config, 'get_target_proxy_config', _target_proxy_config)
+
+
+@pytest.fixture(autouse=True, scope="module")
+def quiet_loggers():
+    """Silence werkzeug and application INFO logging for this module"""
+    loggers = [logging.getLogger(name) for name in ('werkzeug', 'first_hop_proxy')]
+    previous = [logger.level for logger in loggers]
+    for logger in loggers:
+        logger.setLevel(logging.ERROR)
+    yield
+    for logger, level in zip(loggers, previous):
+        logger.setLevel(level)
+
+
+@pytest.fixture(autouse=True)
+def stub_network(request):
+    """Stub out the target proxy for tests marked 'network' unless --run-network is given"""
+    if request.node.get_closest_marker('network') and not request.config.getoption('--run-network'):
+        request.getfixturevalue('mock_forward')
+
+
+@pytest.fixture(scope="module")
+def pool():
+    """Worker pool shared by the concurrency tests in this module"""
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        yield executor
+
+
+@pytest.fixture(scope="module")
+def large_body(big_string):
+    """JSON body with a 1MB message, built once for the large request test"""
+    return _encode_request({
+        "model": "gpt-3.5-turbo",
+        "messages": [
+            {"role": "user", "content": big_string}  # 1MB message
+        ],
+        "temperature": 0.7,
+        "max_tokens": 100,
+        "stream": False
+    })
+
+
+@pytest.fixture
+def mock_forward(monkeypatch):
+    """Replace ProxyClient.forward_request with an autospecced mock for one test
+
+    The mock answers with ``_DEFAULT_CHAT_RESPONSE`` unless a test overrides it.
+    """
+    mock = create_autospec(ProxyClient.forward_request, return_value=_DEFAULT_CHAT_RESPONSE)
+    monkeypatch.setattr(ProxyClient, 'forward_request', mock)
+    return mock
+
+
+# Base WSGI environs for JSON POSTs to /chat/completions, keyed by encoded body
+_CHAT_ENVIRONS = {}
+
+
+def _chat_environ(body):
+    """Copy of the cached environ for ``body`` with a fresh input stream"""
+    environ = _CHAT_ENVIRONS.get(body)
+    if environ is None:
+        environ = _CHAT_ENVIRONS[body] = EnvironBuilder(
+            path='/chat/completions', method='POST', data=body, content_type='application/json'
+        ).get_environ()
+    return dict(environ, **{'wsgi.input': BytesIO(body)})
+
+
+def _post_chat(body=None, **kwargs):
+    """Dispatch a POST to /chat/completions directly, bypassing the WSGI test client
+
+    ``body`` may be a dict to serialize or pre-encoded JSON bytes. Plain byte
+    bodies reuse a cached environ instead of going through EnvironBuilder.
+    """
+    if isinstance(body, bytes) and not kwargs:
+        with app.request_context(_chat_environ(body)):
+            return app.full_dispatch_request()
+    if isinstance(body, bytes):
+        kwargs['data'] = body
+        kwargs.setdefault('content_type', 'application/json')
+    elif body is not None:
+        kwargs['json'] = body
+    with app.test_request_context('/chat/completions', method='POST', **kwargs):
+        return app.full_dispatch_request()
+
+
+def _assert_models_context(mock_forward, response, expected_url=_MODELS_URL):
+    """Assert that /models was forwarded as a GET to the derived models URL"""
+    mock_forward.assert_called_once()
+    proxy_client = mock_forward.call_args[0][0]
+    assert proxy_client.target_url == expected_url
+    assert mock_forward.call_args[1]['method'] == 'GET'
+
+    # The proxied list must come back as-is, not the DEFAULT_MODELS fallback
+    assert response.get_json() == {"object": "list", "data": list(_MODELS_RESPONSE["data"])}
+
+
+def _assert_default_models(mock_forward, response):
+    """Assert that /models fell back to the built-in default models"""
+    assert response.get_json() == _EXPECTED_DEFAULT
+
+
+def _assert_auth_forwarded(mock_forward, response):
+    """Assert that /models forwarded the caller's Authorization header"""
+    _assert_models_context(mock_forward, response)
+    forwarded = mock_forward.call_args[1]['headers']
+    assert forwarded['Authorization'] == _AUTH_HEADERS['Authorization']
+
+
+def _models_response(**overrides):
+    """Plain dict copy of _MODELS_RESPONSE that jsonify can serialize"""
+    return dict(_MODELS_RESPONSE, **overrides)
+
+
+def _return_models(mock_forward):
+    """Make the target proxy answer with a model list"""
+    mock_forward.return_value = _models_response()
+
+
+def _raise(exception):
+    """Make the target proxy fail with the given exception"""
+    def apply(mock_forward):
+        mock_forward.side_effect = exception
+    return apply
+
 
 class TestMainApplication:
     """Test suite for the main Flask application"""
     
-    @pytest.fixture
-    def app(self):
-        """Create a test Flask application"""
-        app.config['TESTING'] = True
-        return app
-    
-    @pytest.fixture
-    def client(self, app):
-        """Create a test client"""
-        return app.test_client()
     
-    @pytest.fixture
-    def sample_chat_request(self):
-        """Sample OpenAI-compatible chat completion request"""
-        return {
-            "model": "gpt-3.5-turbo",
-            "messages": [
-                {"role": "user", "content": "Hello, how are you?"}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 100,
-            "stream": False
-        }
-    
-    @pytest.fixture
-    def sample_streaming_request(self):
-        """Sample streaming chat completion request"""
-        return {
-            "model": "gpt-3.5-turbo",
-            "messages": [
-                {"role": "user", "content": "Hello, how are you?"}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 100,
-            "stream": True
-        }
-
     def test_app_creation(self, app):
         """Test that the Flask app can be created"""
         assert app is not None
         assert app.config['TESTING'] is True
 
+    def test_client_uses_session_app(self, app, client):
+        """Test that the shared client is bound to the session testing app"""
+        assert client.application is app
+
     def test_health_check_endpoint(self, client):
         """Test health check endpoint exists and responds"""
         # This test will fail until we implement the endpoint
@@ -84,327 +266,136 @@ class TestMainApplication:
             assert 'object' in model
             assert model['object'] == 'model'
 
-    def test_models_endpoint_url_construction(self, client):
-        """Test that /models endpoint returns valid response format"""
-        with patch('first_hop_proxy.config.Config.get_target_proxy_config') as mock_config:
-            # Mock the target proxy config
-            mock_config.return_value = {
-                "url": "https://test-proxy.example.com/proxy/google-ai/chat/completions"
-            }
-            
-            with patch('first_hop_proxy.proxy_client.ProxyClient.forward_request') as mock_forward:
-                # Mock successful response from proxy client
-                mock_response = {
-                    "object": "list",
-                    "data": [
-                        {"id": "test-model", "object": "model"}
-                    ]
-                }
-                mock_forward.return_value = mock_response
-                
-                response = client.get('/models')
-                
-                # Verify the response is correct
-                data = response.get_json()
-                assert data['object'] == 'list'
-                assert 'data' in data
-                assert len(data['data']) > 0
-
-    def test_models_endpoint_url_construction_logic(self, client):
-        """Test that /models endpoint returns valid response format"""
-        with patch('first_hop_proxy.config.Config.get_target_proxy_config') as mock_config:
-            # Mock the target proxy config
-            mock_config.return_value = {
-                "url": "https://test-proxy.example.com/proxy/google-ai/chat/completions"
-            }
-            
-            with patch('first_hop_proxy.proxy_client.ProxyClient.forward_request') as mock_forward:
-                # Mock successful response from proxy client
-                mock_response = {
-                    "object": "list",
-                    "data": [{"id": "test-model", "object": "model"}]
-                }
-                mock_forward.return_value = mock_response
-                
-                response = client.get('/models')
-                
-                # Verify the response is correct
-                data = response.get_json()
-                assert data['object'] == 'list'
-                assert 'data' in data
-                assert len(data['data']) > 0
-
-    def test_models_endpoint_fallback_to_default_models(self, client):
-        """Test that /models falls back to default models when target proxy fails"""
-        with patch('first_hop_proxy.config.Config.get_target_proxy_config') as mock_config:
-            # Mock the target proxy config
-            mock_config.return_value = {
-                "url": "https://test-proxy.example.com/proxy/google-ai/chat/completions"
-            }
-            
-            with patch('first_hop_proxy.proxy_client.ProxyClient.forward_request') as mock_forward:
-                # Mock failure
-                mock_forward.side_effect = Exception("Target proxy unavailable")
-                
-                response = client.get('/models')
-                data = response.get_json()
-                
-                # Should return default models
-                assert 'object' in data
-                assert data['object'] == 'list'
-                assert 'data' in data
-                assert isinstance(data['data'], list)
-                
-                # Check that default models are returned
-                from first_hop_proxy.constants import DEFAULT_MODELS
-                assert data['data'] == DEFAULT_MODELS
-
-    def test_models_endpoint_with_authentication_headers(self, client):
-        """Test that /models properly forwards authentication headers"""
-        with patch('first_hop_proxy.config.Config.get_target_proxy_config') as mock_config:
-            # Mock the target proxy config
-            mock_config.return_value = {
-                "url": "https://test-proxy.example.com/proxy/google-ai/chat/completions"
-            }
-            
-            with patch('first_hop_proxy.proxy_client.ProxyClient.forward_request') as mock_forward:
-                # Mock successful response from proxy client
-                mock_response = {
-                    "object": "list",
-                    "data": [
-                        {"id": "test-model", "object": "model"}
-                    ]
-                }
-                mock_forward.return_value = mock_response
-                
-                response = client.get('/models')
-                
-                # Verify the response is correct
-                data = response.get_json()
-                assert data['object'] == 'list'
-                assert 'data' in data
-                assert len(data['data']) > 0
-
-    def test_models_endpoint_handles_http_errors(self, client):
-        """Test that /models handles HTTP errors from target proxy"""
-        with patch('first_hop_proxy.config.Config.get_target_proxy_config') as mock_config:
-            # Mock the target proxy config
-            mock_config.return_value = {
-                "url": "https://test-proxy.example.com/proxy/google-ai/chat/completions"
-            }
-            
-            with patch('first_hop_proxy.error_handler.ErrorHandler.retry_with_backoff') as mock_retry:
-                from requests.exceptions import HTTPError
-                from requests import Response
-                
-                # Mock HTTP error response
-                mock_response = Response()
-                mock_response.status_code = 404
-                mock_response._content = b'{"error": "Not found"}'
-                mock_retry.side_effect = HTTPError("404 Client Error", response=mock_response)
-                
-                response = client.get('/models')
-                data = response.get_json()
-                
-                # Should return default models on HTTP error
-                assert 'object' in data
-                assert data['object'] == 'list'
-                assert 'data' in data
-                assert isinstance(data['data'], list)
-                
-                # Check that default models are returned
-                from first_hop_proxy.constants import DEFAULT_MODELS
-                assert data['data'] == DEFAULT_MODELS
-
-    def test_chat_completions_endpoint_exists(self, client, sample_chat_request):
+    @pytest.mark.parametrize("request_headers, mock_behavior, validator", [
+        (None, _return_models, _assert_models_context),
+        (None, _raise(Exception("Target proxy unavailable")), _assert_default_models),
+        (None, _raise(_HTTP_ERROR), _assert_default_models),
+        (_AUTH_HEADERS, _return_models, _assert_auth_forwarded),
+    ], ids=["success", "fallback_on_error", "fallback_on_http_error", "forwards_auth"])
+    def test_models_behaviors(self, client, mock_forward, target_proxy, request_headers, mock_behavior, validator):
+        """Test /models forwarding, header propagation and fallback to default models"""
+        mock_behavior(mock_forward)
+        response = client.get('/models', headers=request_headers)
+        validator(mock_forward, response)
+
+    @pytest.mark.network
+    def test_chat_completions_endpoint_exists(self):
         """Test that /chat/completions endpoint exists"""
-        response = client.post('/chat/completions', 
-                             json=sample_chat_request,
-                             content_type='application/json')
+        response = _post_chat(_SAMPLE_BODY)
         # Should not return 404 (endpoint exists)
         assert response.status_code != 404
 
-    def test_chat_completions_accepts_valid_request(self, client, sample_chat_request):
+    @pytest.mark.network
+    def test_chat_completions_accepts_valid_request(self):
         """Test that /chat/completions accepts valid OpenAI format"""
-        response = client.post('/chat/completions', 
-                             json=sample_chat_request,
-                             content_type='application/json')
+        response = _post_chat(_SAMPLE_BODY)
         
         # Should return some response (not necessarily 200 if proxy is down)
         # 500 is acceptable when config is not loaded in test mode
         assert response.status_code in [200, 500, 502, 503, 504]
 
-    def test_chat_completions_rejects_invalid_request(self, client):
+    def test_chat_completions_rejects_invalid_request(self):
         """Test that /chat/completions rejects invalid requests"""
         invalid_request = {
             "model": "gpt-3.5-turbo",
             # Missing messages field
         }
         
-        response = client.post('/chat/completions', 
-                             json=invalid_request,
-                             content_type='application/json')
+        response = _post_chat(invalid_request)
         
         assert response.status_code == 400
 
-    def test_chat_completions_handles_streaming(self, client, sample_streaming_request):
+    @pytest.mark.network
+    def test_chat_completions_handles_streaming(self):
         """Test that /chat/completions handles streaming requests"""
-        response = client.post('/chat/completions', 
-                             json=sample_streaming_request,
-                             content_type='application/json')
+        response = _post_chat(_SAMPLE_STREAM_BODY)
         
         # Should return some response
         # 500 is acceptable when config is not loaded in test mode
         assert response.status_code in [200, 500, 502, 503, 504]
 
-    def test_chat_completions_returns_openai_format(self, client, sample_chat_request):
+    def test_chat_completions_relays_stream(self, mock_forward, target_proxy):
+        """Test that a streaming upstream body is relayed as an event stream"""
+        chunks = [b'data: {"choices":[{"delta":{"content":"Hi"}}]}\n\n', b'data: [DONE]\n\n']
+        mock_forward.return_value = iter(chunks)
+        
+        response = _post_chat(_SAMPLE_STREAM_BODY)
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        assert response.get_data() == b''.join(chunks)
+
+    def test_chat_completions_returns_openai_format(self, mock_forward, target_proxy):
         """Test that /chat/completions returns OpenAI-compatible format"""
-        with patch('first_hop_proxy.config.Config.get_target_proxy_config') as mock_config:
-            # Mock the target proxy config
-            mock_config.return_value = {
-                "url": "https://test-proxy.example.com/proxy/google-ai/chat/completions"
-            }
-            
-            with patch('first_hop_proxy.proxy_client.ProxyClient.forward_request') as mock_forward:
-                mock_forward.return_value = {
-                    "choices": [{
-                        "message": {
-                            "role": "assistant",
-                            "content": "Hello! I'm doing well, thank you for asking."
-                        },
-                        "finish_reason": "stop",
-                        "index": 0
-                    }],
-                    "model": "gpt-3.5-turbo",
-                    "object": "chat.completion",
-                    "usage": {
-                        "prompt_tokens": 10,
-                        "completion_tokens": 15,
-                        "total_tokens": 25
-                    }
-                }
-                
-                response = client.post('/chat/completions', 
-                                     json=sample_chat_request,
-                                     content_type='application/json')
-                
-                data = response.get_json()
-                assert 'choices' in data
-                assert isinstance(data['choices'], list)
-                assert len(data['choices']) > 0
-                assert 'message' in data['choices'][0]
-                assert 'content' in data['choices'][0]['message']
-
-    def test_chat_completions_url_construction(self, client, sample_chat_request):
+        response = _post_chat(_SAMPLE_BODY)
+        
+        data = response.get_json()
+        assert 'choices' in data
+        assert isinstance(data['choices'], list)
+        assert len(data['choices']) > 0
+        assert 'message' in data['choices'][0]
+        assert 'content' in data['choices'][0]['message']
+
+    def test_chat_completions_url_construction(self, mock_forward, target_proxy):
         """Test that /chat/completions uses correct URL construction"""
-        with patch('first_hop_proxy.config.Config.get_target_proxy_config') as mock_config:
-            # Mock the target proxy config
-            mock_config.return_value = {
-                "url": "https://test-proxy.example.com/proxy/google-ai/chat/completions"
-            }
-            
-            with patch('first_hop_proxy.proxy_client.ProxyClient.forward_request') as mock_forward:
-                # Mock successful response from proxy client
-                mock_forward.return_value = {
-                    "choices": [{
-                        "message": {"role": "assistant", "content": "Test response"},
-                        "finish_reason": "stop",
-                        "index": 0
-                    }]
-                }
-                
-                response = client.post('/chat/completions', 
-                                     json=sample_chat_request,
-                                     content_type='application/json')
-                
-                # Verify the response is correct
-                data = response.get_json()
-                assert 'choices' in data
-                assert len(data['choices']) > 0
-
-    def test_error_response_format(self, client, sample_chat_request):
+        response = _post_chat(_SAMPLE_BODY)
+        
+        # Verify the request went to the configured target proxy URL
+        proxy_client = mock_forward.call_args[0][0]
+        assert proxy_client.target_url == _TARGET_PROXY_URL
+        data = response.get_json()
+        assert 'choices' in data
+        assert len(data['choices']) > 0
+
+    def test_error_response_format(self, target_proxy, monkeypatch):
         """Test that error responses follow OpenAI format"""
-        with patch('first_hop_proxy.config.Config.get_target_proxy_config') as mock_config:
-            # Mock the target proxy config
-            mock_config.return_value = {
-                "url": "https://test-proxy.example.com/proxy/google-ai/chat/completions"
-            }
-            
-            with patch('first_hop_proxy.error_handler.ErrorHandler.retry_with_backoff') as mock_retry:
-                mock_retry.side_effect = Exception("Test error")
-                
-                response = client.post('/chat/completions', 
-                                     json=sample_chat_request,
-                                     content_type='application/json')
-                
-                data = response.get_json()
-                assert 'error' in data
-                assert 'message' in data['error']
+        monkeypatch.setattr(ErrorHandler, 'retry_with_backoff', MagicMock(side_effect=Exception("Test error")))
+        
+        response = _post_chat(_SAMPLE_BODY)
+        
+        data = response.get_json()
+        assert 'error' in data
+        assert 'message' in data['error']
 
     def test_cors_headers(self, client):
         """Test that CORS headers are properly set"""
         response = client.get('/models')
         assert 'Access-Control-Allow-Origin' in response.headers
 
-    def test_content_type_headers(self, client, sample_chat_request):
+    def test_content_type_headers(self, client):
         """Test that content-type headers are properly set"""
         response = client.post('/chat/completions', 
-                             json=sample_chat_request,
+                             data=_SAMPLE_BODY,
                              content_type='application/json')
         
         assert 'Content-Type' in response.headers
         assert 'application/json' in response.headers['Content-Type']
 
-    def test_request_logging(self, client, sample_chat_request):
+    def test_request_logging(self, mock_forward, target_proxy, caplog):
         """Test that requests are properly logged"""
-        with patch('first_hop_proxy.config.Config.get_target_proxy_config') as mock_config:
-            # Mock the target proxy config
-            mock_config.return_value = {
-                "url": "https://test-proxy.example.com/proxy/google-ai/chat/completions"
-            }
-            
-            with patch('first_hop_proxy.proxy_client.ProxyClient.forward_request') as mock_forward:
-                # Create a proper mock response
-                mock_response = {
-                    "choices": [{
-                        "message": {"role": "assistant", "content": "Test response"},
-                        "finish_reason": "stop",
-                        "index": 0
-                    }],
-                    "model": "gpt-3.5-turbo",
-                    "object": "chat.completion",
-                    "usage": {
-                        "prompt_tokens": 10,
-                        "completion_tokens": 15,
-                        "total_tokens": 25
-                    }
-                }
-                mock_forward.return_value = mock_response
-                
-                # Make the request - logging happens internally
-                response = client.post('/chat/completions', 
-                                     json=sample_chat_request,
-                                     content_type='application/json')
-                
-                # Verify the request was processed successfully
-                assert response.status_code == 200
-                data = response.get_json()
-                assert 'choices' in data
-
-    def test_invalid_json_handling(self, client):
+        caplog.set_level(logging.INFO, logger='first_hop_proxy')
+        # Make the request - logging happens internally
+        response = _post_chat(_SAMPLE_BODY)
+        
+        # Verify the request was processed successfully
+        assert response.status_code == 200
+        data = response.get_json()
+        assert 'choices' in data
+
+        # A successful request should not log any errors
+        assert not [r for r in caplog.records if r.levelno >= logging.ERROR]
+
+    def test_invalid_json_handling(self):
         """Test handling of invalid JSON in request body"""
-        response = client.post('/chat/completions', 
-                             data="invalid json",
-                             content_type='application/json')
+        response = _post_chat(data="invalid json", content_type='application/json')
         
         assert response.status_code == 400
 
-    def test_missing_content_type(self, client, sample_chat_request):
+    @pytest.mark.network
+    def test_missing_content_type(self):
         """Test handling of requests without content-type header"""
         # Use data instead of json to avoid automatic content-type header
-        import json
-        response = client.post('/chat/completions', 
-                              data=json.dumps(sample_chat_request))
+        response = _post_chat(data=_SAMPLE_BODY)
         
         # Should return 400 for missing content-type header
         assert response.status_code == 400
@@ -412,95 +403,72 @@ class TestMainApplication:
         assert 'error' in data
         assert 'Content-Type must be application/json' in data['error']['message']
 
-    def test_large_request_handling(self, client):
+    @pytest.mark.slow
+    @pytest.mark.network
+    def test_large_request_handling(self, large_body):
         """Test handling of very large requests"""
-        large_request = {
-            "model": "gpt-3.5-turbo",
-            "messages": [
-                {"role": "user", "content": "x" * 1000000}  # 1MB message
-            ],
-            "temperature": 0.7,
-            "max_tokens": 100,
-            "stream": False
-        }
-        
-        response = client.post('/chat/completions', 
-                             json=large_request,
-                             content_type='application/json')
+        response = _post_chat(large_body)
         
         # Should handle gracefully (either process or return appropriate error)
         # 500 is acceptable when config is not loaded in test mode
         assert response.status_code in [200, 400, 413, 500, 502, 503, 504]
 
-    def test_concurrent_requests(self, client, sample_chat_request):
+    @pytest.mark.slow
+    @pytest.mark.parametrize("n", [2, 5, 10])
+    def test_concurrent_requests(self, pool, n):
         """Test handling of concurrent requests"""
-        import threading
-        import time
-        
-        results = []
-        
-        def make_request():
-            response = client.post('/chat/completions', 
-                                 json=sample_chat_request,
-                                 content_type='application/json')
-            results.append(response.status_code)
-        
-        # Start multiple concurrent requests
-        threads = []
-        for _ in range(5):
-            thread = threading.Thread(target=make_request)
-            threads.append(thread)
-            thread.start()
-        
-        # Wait for all threads to complete
-        for thread in threads:
-            thread.join()
+        results = list(pool.map(lambda _: _post_chat(_SAMPLE_BODY).status_code, range(n)))
         
         # All requests should complete (not necessarily successfully)
-        assert len(results) == 5
+        assert len(results) == n
         for status_code in results:
             # 500 is acceptable when config is not loaded in test mode
             assert status_code in [200, 400, 500, 502, 503, 504]
 
-    def test_request_timeout_handling(self, client, sample_chat_request):
+    def test_request_timeout_handling(self, target_proxy, monkeypatch):
         """Test handling of request timeouts"""
-        with patch('first_hop_proxy.config.Config.get_target_proxy_config') as mock_config:
-            # Mock the target proxy config
-            mock_config.return_value = {
-                "url": "https://test-proxy.example.com/proxy/google-ai/chat/completions"
-            }
-            
-            with patch('first_hop_proxy.error_handler.ErrorHandler.retry_with_backoff') as mock_retry:
-                mock_retry.side_effect = TimeoutError("Request timeout")
-                
-                response = client.post('/chat/completions', 
-                                     json=sample_chat_request,
-                                     content_type='application/json')
-                
-                # In the new architecture, timeout errors return 500 (internal server error)
-                # This is acceptable behavior for timeout handling
-                assert response.status_code == 500
-
-    def test_memory_usage_under_load(self, client, sample_chat_request):
+        monkeypatch.setattr(ErrorHandler, 'retry_with_backoff', MagicMock(side_effect=TimeoutError("Request timeout")))
+        
+        response = _post_chat(_SAMPLE_BODY)
+        
+        # In the new architecture, timeout errors return 500 (internal server error)
+        # This is acceptable behavior for timeout handling
+        assert response.status_code == 500
+
+    @pytest.mark.memory
+    @pytest.mark.xdist_group("serial")
+    def test_memory_usage_under_load(self):
         """Test memory usage doesn't grow excessively under load"""
-        try:
-            import psutil
-            import os
-            
-            process = psutil.Process(os.getpid())
-            initial_memory = process.memory_info().rss
-            
-            # Make multiple requests
-            for _ in range(10):
-                client.post('/chat/completions', 
-                           json=sample_chat_request,
-                           content_type='application/json')
-            
-            final_memory = process.memory_info().rss
-            memory_increase = final_memory - initial_memory
-            
-            # Memory increase should be reasonable (< 50MB)
-            assert memory_increase < 50 * 1024 * 1024
-        except ImportError:
-            # Skip test if psutil is not available
+        if psutil is None:
             pytest.skip("psutil not available")
+        
+        process = psutil.Process(os.getpid())
+        initial_memory = process.memory_info().rss
+        
+        # Make multiple requests
+        for _ in range(_LOAD_REQUEST_COUNT):
+            _post_chat(_SAMPLE_BODY)
+        
+        final_memory = process.memory_info().rss
+        memory_increase = final_memory - initial_memory
+        
+        # Memory increase should be reasonable (< 50MB)
+        assert memory_increase < 50 * 1024 * 1024
+
+    def test_get_proxy_client_creates_one_client_per_url(self, monkeypatch, pool):
+        """Test concurrent first requests for a URL share a single ProxyClient"""
+        monkeypatch.setattr(main_module, "_proxy_clients", {})
+        created = []
+
+        def make_client(target_url, config=None):
+            created.append(target_url)
+            # Widen the window for a racing creation (time.sleep is patched out by conftest)
+            threading.Event().wait(0.01)
+            return MagicMock(spec=ProxyClient)
+
+        monkeypatch.setattr(main_module, "ProxyClient", make_client)
+
+        clients = list(pool.map(main_module.get_proxy_client, ["https://test-proxy.example.com"] * 32))
+
+        assert created == ["https://test-proxy.example.com"]
+        assert all(client is clients[0] for client in clients)
@@ -1,284 +1,360 @@
 """
 Tests for regex replacement functionality
 """
-import unittest
-import sys
-import os
+import itertools
+import re
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
 
-# Add the parent directory to the path so we can import the modules
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from first_hop_proxy import utils
+from first_hop_proxy.utils import (
+    apply_regex_replacements, process_messages_with_regex, process_response_with_regex,
+    _build_ruleset, _compile, _compile_ruleset, validate_regex_rule
+)
 
-from first_hop_proxy.utils import apply_regex_replacements, process_messages_with_regex
 
+def _rule(pattern, replacement, flags="", apply_to="all"):
+    """Build a replacement rule in the config format"""
+    return {"pattern": pattern, "replacement": replacement, "flags": flags, "apply_to": apply_to}
 
-class TestRegexReplacement(unittest.TestCase):
-    """Test cases for regex replacement functionality"""
-    
-    def test_apply_regex_replacements_basic(self):
-        """Test basic regex replacement"""
-        text = "Hello world, hello there"
-        rules = [
-            {
-                "pattern": "hello",
-                "replacement": "hi",
-                "flags": "i",
-                "apply_to": "all"
-            }
-        ]
-        
-        result = apply_regex_replacements(text, rules)
-        expected = "hi world, hi there"
-        self.assertEqual(result, expected)
-    
-    def test_apply_regex_replacements_multiple_rules(self):
-        """Test multiple regex replacement rules"""
-        text = "Hello world, hello there"
-        rules = [
-            {
-                "pattern": "hello",
-                "replacement": "hi",
-                "flags": "i",
-                "apply_to": "all"
-            },
-            {
-                "pattern": "world",
-                "replacement": "earth",
-                "flags": "",
-                "apply_to": "all"
-            }
-        ]
-        
-        result = apply_regex_replacements(text, rules)
-        expected = "hi earth, hi there"
-        self.assertEqual(result, expected)
-    
-    def test_apply_regex_replacements_with_flags(self):
-        """Test regex replacement with different flags"""
-        text = "Hello\nWorld\nHello"
-        rules = [
-            {
-                "pattern": "hello",
-                "replacement": "hi",
-                "flags": "im",  # case insensitive and multiline
-                "apply_to": "all"
-            }
-        ]
-        
-        result = apply_regex_replacements(text, rules)
-        expected = "hi\nWorld\nhi"
-        self.assertEqual(result, expected)
-    
-    def test_apply_regex_replacements_empty_text(self):
-        """Test regex replacement with empty text"""
-        text = ""
-        rules = [
-            {
-                "pattern": "hello",
-                "replacement": "hi",
-                "flags": "i",
-                "apply_to": "all"
-            }
-        ]
-        
-        result = apply_regex_replacements(text, rules)
-        self.assertEqual(result, "")
-    
-    def test_apply_regex_replacements_no_rules(self):
-        """Test regex replacement with no rules"""
-        text = "Hello world"
-        rules = []
-        
-        result = apply_regex_replacements(text, rules)
-        self.assertEqual(result, text)
-    
-    def test_apply_regex_replacements_invalid_rule(self):
-        """Test regex replacement with invalid rule (should continue processing)"""
-        text = "Hello world"
-        rules = [
-            {
-                "pattern": "[invalid",  # Invalid regex pattern
-                "replacement": "hi",
-                "flags": "",
-                "apply_to": "all"
-            },
-            {
-                "pattern": "world",
-                "replacement": "earth",
-                "flags": "",
-                "apply_to": "all"
-            }
-        ]
-        
-        result = apply_regex_replacements(text, rules)
-        expected = "Hello earth"  # Should still apply the second rule
-        self.assertEqual(result, expected)
+
+_HELLO_TO_HI = _rule("hello", "hi", "i")
+
+
+@pytest.mark.parametrize("text,rules,expected", [
+    ("Hello world, hello there", [_HELLO_TO_HI], "hi world, hi there"),
+    ("Hello world, hello there", [_HELLO_TO_HI, _rule("world", "earth")], "hi earth, hi there"),
+    # case insensitive and multiline
+    ("Hello\nWorld\nHello", [_rule("hello", "hi", "im")], "hi\nWorld\nhi"),
+    ("", [_HELLO_TO_HI], ""),
+    ("Hello world", [], "Hello world"),
+    # an invalid pattern is skipped and the second rule still applies
+    ("Hello world", [_rule("[invalid", "hi"), _rule("world", "earth")], "Hello earth"),
+    # backreference templates are expanded, and one naming a missing group is skipped
+    ("Hello world", [_rule(r"(\w+) (\w+)", r"\2 \1")], "world Hello"),
+    ("Hello world", [_rule("(world)", r"\g<1>\n")], "Hello world\n"),
+    ("Hello world", [_rule("world", r"\1"), _HELLO_TO_HI], "hi world"),
+    # escaped backslashes in a template without group references are expanded once
+    ("a/b", [_rule("/", r"C:\\path")], r"aC:\pathb"),
+    ("a/b", [_rule("/", "\\\\")], "a\\b"),
+    # a non-string replacement is dropped when the rules are compiled
+    ("Hello world", [_rule(r"w\w+", 5), _HELLO_TO_HI], "hi world"),
+], ids=["basic", "multiple_rules", "with_flags", "empty_text", "no_rules", "invalid_rule",
+        "backreference", "template_escape", "invalid_template", "escaped_backslash_path",
+        "escaped_backslash", "invalid_replacement"])
+def test_apply_regex_replacements(text, rules, expected):
+    """Test regex replacement rules applied to a single text"""
+    assert apply_regex_replacements(text, rules) == expected
+
+
+def test_apply_regex_replacements_compiles_each_rule_once():
+    """Test that rule patterns are compiled once and reused across messages"""
+    _build_ruleset.cache_clear()
+    messages = [{"role": "user", "content": f"Hello {i}"} for i in range(5)]
+    rules = [_HELLO_TO_HI, _rule("[invalid", "x")]
+
+    result = process_messages_with_regex(messages, rules)
+
+    assert [m["content"] for m in result] == [f"hi {i}" for i in range(5)]
+    # compiled on the first user message and reused without a cache lookup per message
+    info = _build_ruleset.cache_info()
+    assert info.misses == 1
+    assert info.hits == 0
+
+
+@pytest.mark.parametrize("text,rules,passes,expected", [
+    # independent literal rules are applied in a single pass
+    ("Hello world, hello there", [_HELLO_TO_HI, _rule("world", "earth", "i")], 1, "hi earth, hi there"),
+    # a rule whose output feeds a later rule is not fused
+    ("hello world", [_rule("hello", "hi"), _rule("hi", "hey")], 2, "hey world"),
+    # single-character swaps become one translate table
+    ("a-b_c", [_rule("-", " "), _rule("_", " "), _rule("c", "d")], 1, "a b d"),
+    # re folds the long s and the Kelvin sign onto "s" and "k", which str.lower does not
+    ("x", [_rule("x", "\u017f", "i"), _rule("s", "y", "i")], 2, "y"),
+    ("x", [_rule("x", "\u212a", "i"), _rule("k", "y", "i")], 2, "y"),
+], ids=["fuses_independent_literals", "keeps_dependent_rules_sequential", "translates_single_characters",
+        "ignore_case_long_s", "ignore_case_kelvin_sign"])
+def test_apply_regex_replacements_fusion(text, rules, passes, expected):
+    """Test literal rule fusion keeps sequential semantics"""
+    assert len(_compile_ruleset(rules)) == passes
+    assert apply_regex_replacements(text, rules) == expected
+
+
+@pytest.mark.parametrize("messages,rules,expected", [
+    (
+        [{"role": "user", "content": "Hello world"}, {"role": "assistant", "content": "Hello there"}],
+        [_rule("hello", "hi", "i", apply_to="user")],
+        # the assistant message should not be changed
+        [{"role": "user", "content": "hi world"}, {"role": "assistant", "content": "Hello there"}],
+    ),
+    (
+        [
+            {"role": "user", "content": "Hello world"},
+            {"role": "assistant", "content": "Hello there"},
+            {"role": "system", "content": "Hello system"},
+        ],
+        [_HELLO_TO_HI],
+        [
+            {"role": "user", "content": "hi world"},
+            {"role": "assistant", "content": "hi there"},
+            {"role": "system", "content": "hi system"},
+        ],
+    ),
+    ([], [_HELLO_TO_HI], []),
+    (
+        [{"role": "user", "content": ""}, {"role": "assistant", "content": None}],
+        [_HELLO_TO_HI],
+        [{"role": "user", "content": ""}, {"role": "assistant", "content": None}],
+    ),
+    (
+        [{"role": "user", "content": "Hello world", "name": "test_user", "timestamp": "2023-01-01"}],
+        [_HELLO_TO_HI],
+        [{"role": "user", "content": "hi world", "name": "test_user", "timestamp": "2023-01-01"}],
+    ),
+    (
+        # role-specific and "all" rules still apply in their configured order
+        [{"role": "user", "content": "hello"}, {"role": "system", "content": "hello"}],
+        [_rule("hello", "hi", apply_to="user"), _rule("hi", "hey"), _rule("hello", "yo")],
+        [{"role": "user", "content": "hey"}, {"role": "system", "content": "yo"}],
+    ),
+], ids=["by_role", "all_roles", "empty_messages", "no_content", "preserves_other_fields", "rule_order"])
+def test_process_messages_with_regex(messages, rules, expected):
+    """Test regex replacement rules applied across chat messages"""
+    assert process_messages_with_regex(messages, rules) == expected
+
+
+def test_process_messages_with_regex_skips_roles_without_rules():
+    """Test messages with no applicable rules are passed through untouched"""
+    messages = [{"role": "user", "content": "Hello"}, {"role": "assistant", "content": "Hello"}]
+
+    result = process_messages_with_regex(messages, [_rule("hello", "hi", "i", apply_to="user")])
+
+    assert result[0] == {"role": "user", "content": "hi"}
+    assert result[1] is messages[1]
+
+
+def test_apply_regex_replacements_skips_absent_literals():
+    """Test literal rules are not run against text that cannot contain them"""
+    rules = [_HELLO_TO_HI, _rule("h(i)", r"h\1!")]
+    prefilter = _compile_ruleset(rules)[0][3]
+    assert prefilter == (("hello",), True)
+
+    assert apply_regex_replacements("Goodbye world", rules) == "Goodbye world"
+    assert apply_regex_replacements("HELLO world", rules) == "hi! world"
+    # non-ASCII text is left to the regex engine, which folds dotless i onto "i"
+    assert apply_regex_replacements("ı", [_rule("i", "x", "i")]) == "x"
+
+
+def test_process_response_with_regex_compiles_rules_once():
+    """Test response choices share one compiled ruleset"""
+    _build_ruleset.cache_clear()
+    response = {"choices": [{"message": {"content": f"Hello {i}"}} for i in range(3)]}
+
+    result = process_response_with_regex(response, [_HELLO_TO_HI])
+
+    assert [c["message"]["content"] for c in result["choices"]] == ["hi 0", "hi 1", "hi 2"]
+    assert _build_ruleset.cache_info().misses == 1
+    assert _build_ruleset.cache_info().hits == 0
+    compiled = _compile_ruleset([_HELLO_TO_HI])
+    assert apply_regex_replacements("Hello", compiled) == "hi"
+
+
+def test_apply_regex_replacements_literal_fast_path():
+    """Test a lone case-sensitive literal is replaced without the regex engine"""
+    rules = [_rule("â€”", "—")]
+    compiled = _compile_ruleset(rules)[0][0]
+    assert not isinstance(compiled, re.Pattern)
+
+    assert apply_regex_replacements("a â€” b â€” c", rules) == "a — b — c"
+    assert apply_regex_replacements("a - b", rules) == "a - b"
+
+
+def test_apply_regex_replacements_literal_automaton():
+    """Test prefix-sharing literals are swapped in one Aho-Corasick pass when available"""
+    pytest.importorskip("ahocorasick")
+    rules = [_rule("â€”", "—"), _rule("â€œ", "“"), _rule("aa", "b")]
+    assert len(_compile_ruleset(rules)) == 1
+
+    assert apply_regex_replacements("â€œaaaâ€” x", rules) == "“ba— x"
+
+
+def test_apply_regex_replacements_skips_text_without_triggers():
+    """Test clean text skips every literal pass after one trigger scan"""
+    rules = [_rule("â€”", "—"), _rule("â€œ", "“"), _rule("Ã©", "é")]
+    compiled = _compile_ruleset(rules)
+    assert compiled.triggers == {"â", "Ã"}
+
+    text = "Nothing to fix here"
+    assert apply_regex_replacements(text, compiled) is text
+    assert apply_regex_replacements("cafÃ©", compiled) == "café"
+    # any non-literal rule disables the shortcut
+    assert _compile_ruleset(rules + [_rule(r"\d", "#")]).triggers is None
+
+
+def test_process_with_regex_copies_only_changed_content():
+    """Test unchanged messages and choices are passed through instead of copied"""
+    messages = [{"role": "user", "content": "Hello"}, {"role": "user", "content": "Bye"}]
+    result = process_messages_with_regex(messages, [_HELLO_TO_HI])
+    assert result[0] == {"role": "user", "content": "hi"}
+    assert result[1] is messages[1]
+    unchanged = messages[1:]
+    assert process_messages_with_regex(unchanged, [_HELLO_TO_HI]) is unchanged
+
+    response = {"choices": [{"message": {"content": "Hello"}}, {"message": {"content": "Bye"}}]}
+    result = process_response_with_regex(response, [_HELLO_TO_HI])
+    assert result["choices"][0]["message"]["content"] == "hi"
+    assert result["choices"][1] is response["choices"][1]
+    assert response["choices"][0]["message"]["content"] == "Hello"
+    assert process_response_with_regex(response, [_rule("xyz", "")]) is response
+
+
+@pytest.mark.parametrize("pattern,flags,prefilter", [
+    (r"hello\s+world", "", (("hello",), False)),
+    (r"(?i)Hello\d", "", (("hello",), True)),
+    ("ab|ac", "", (("a",), False)),
+    (r"^hello", "", None),
+    (r"\d+", "", None),
+], ids=["leading_literal", "inline_ignore_case", "factored_alternation", "anchor", "no_literal"])
+def test_regex_rules_prefilter_on_literal_prefix(pattern, flags, prefilter):
+    """Test regex rules are skipped when the literal text they start with is absent"""
+    assert _compile_ruleset([_rule(pattern, "x", flags)])[0][3] == prefilter
+
+
+def test_process_response_with_regex_parallel_choices(monkeypatch):
+    """Test long choices keep their order when processed on the thread pool"""
+    monkeypatch.setattr(utils, "_gil_enabled", lambda: False)
+    long_text = "Hello " * 500
+    response = {"choices": [{"message": {"content": f"{i} {long_text}"}} for i in range(4)]}
+    response["choices"].append({"finish_reason": "stop"})
+
+    result = process_response_with_regex(response, [_HELLO_TO_HI])
+
+    expected = [f"{i} {'hi ' * 500}" for i in range(4)]
+    assert [c["message"]["content"] for c in result["choices"][:4]] == expected
+    assert result["choices"][4] is response["choices"][4]
+    assert utils._choice_pool is not None
+
+
+def test_apply_regex_replacements_reuses_results_for_repeated_text():
+    """Test repeated text is served from the result cache without rerunning the passes"""
+    compiled = _compile_ruleset([_rule(r"hel+o", "hi", "i")])
+    text = "Hello again"
+
+    first = apply_regex_replacements(text, compiled)
+    apply_regex_replacements("Goodbye", compiled)
+    with patch.object(utils, "_apply_passes") as mock_apply:
+        assert apply_regex_replacements("Hello" + " again", compiled) == first
+        # unchanged text comes back as the caller's own object
+        unchanged = "".join(["Good", "bye"])
+        assert apply_regex_replacements(unchanged, compiled) is unchanged
+    mock_apply.assert_not_called()
+
+
+def test_process_messages_with_regex_joins_literal_rules_per_role():
+    """Test same-role messages share one pass when every rule is a literal"""
+    assert _compile_ruleset([_HELLO_TO_HI, _rule("â€”", "—")]).joinable
+    assert not _compile_ruleset([_rule("^hello", "hi")]).joinable
+    messages = [
+        {"role": "user", "content": "Hello â€” one"},
+        {"role": "user", "content": "Bye"},
+        {"role": "user", "content": [{"type": "text", "text": "Hello"}]},
+        {"role": "assistant", "content": "hello"},
+    ]
+
+    result = process_messages_with_regex(messages, [_HELLO_TO_HI, _rule("â€”", "—")])
+
+    assert [m["content"] for m in result[:2]] == ["hi — one", "Bye"]
+    assert result[1] is messages[1]
+    # non-string content is passed through untouched
+    assert result[2] is messages[2]
+    assert result[3] == {"role": "assistant", "content": "hi"}
+    # a replacement that inserts the join separator falls back to one message at a time
+    messages = [{"role": "user", "content": "a-b"}, {"role": "user", "content": "c-d"}]
+    result = process_messages_with_regex(messages, [_rule("-", "\x00")])
+    assert [m["content"] for m in result] == ["a\x00b", "c\x00d"]
+
+
+@pytest.mark.parametrize("pattern,replacement", [
+    ("/", r"C:\\path"),
+    ("/", "\\\\"),
+    ("(/)", r"[\1]\n"),
+    ("(?P<slash>/)", r"\g<slash>\\"),
+    ("/", r"\t"),
+    ("/", r"\2"),
+    ("/", r"\q"),
+], ids=["escaped_path", "escaped_backslash", "group_and_escape", "named_group", "tab", "missing_group",
+        "bad_escape"])
+def test_validated_rules_apply_without_raising(pattern, replacement):
+    """Test a rule that passes validation applies like re.sub instead of raising"""
+    try:
+        validate_regex_rule(pattern, replacement)
+    except re.error:
+        with pytest.raises(re.error):
+            re.sub(pattern, replacement, "a/b")
+        return
     
-    def test_process_messages_with_regex(self):
-        """Test processing messages with regex replacement"""
-        messages = [
-            {
-                "role": "user",
-                "content": "Hello world"
-            },
-            {
-                "role": "assistant",
-                "content": "Hello there"
-            }
-        ]
-        
-        rules = [
-            {
-                "pattern": "hello",
-                "replacement": "hi",
-                "flags": "i",
-                "apply_to": "user"
-            }
-        ]
-        
-        result = process_messages_with_regex(messages, rules)
-        
-        expected = [
-            {
-                "role": "user",
-                "content": "hi world"
-            },
-            {
-                "role": "assistant",
-                "content": "Hello there"  # Should not be changed
-            }
-        ]
-        
-        self.assertEqual(result, expected)
+    expected = re.sub(pattern, replacement, "a/b")
+    assert apply_regex_replacements("a/b", [_rule(pattern, replacement)]) == expected
+    assert process_messages_with_regex([{"role": "user", "content": "a/b"}],
+                                       [_rule(pattern, replacement)])[0]["content"] == expected
+
+
+def test_process_messages_with_regex_caches_joined_messages_per_message():
+    """Test the joined path caches each message rather than the joined string"""
+    rules = [_HELLO_TO_HI, _rule("â€”", "—")]
+    messages = [{"role": "user", "content": f"Hello â€” {i}"} for i in range(3)]
+    utils._result_cache.clear()
     
-    def test_process_messages_with_regex_all_roles(self):
-        """Test processing messages with regex replacement for all roles"""
-        messages = [
-            {
-                "role": "user",
-                "content": "Hello world"
-            },
-            {
-                "role": "assistant",
-                "content": "Hello there"
-            },
-            {
-                "role": "system",
-                "content": "Hello system"
-            }
-        ]
-        
-        rules = [
-            {
-                "pattern": "hello",
-                "replacement": "hi",
-                "flags": "i",
-                "apply_to": "all"
-            }
-        ]
-        
-        result = process_messages_with_regex(messages, rules)
-        
-        expected = [
-            {
-                "role": "user",
-                "content": "hi world"
-            },
-            {
-                "role": "assistant",
-                "content": "hi there"
-            },
-            {
-                "role": "system",
-                "content": "hi system"
-            }
-        ]
-        
-        self.assertEqual(result, expected)
+    result = process_messages_with_regex(messages, rules)
     
-    def test_process_messages_with_regex_empty_messages(self):
-        """Test processing empty messages"""
-        messages = []
-        rules = [
-            {
-                "pattern": "hello",
-                "replacement": "hi",
-                "flags": "i",
-                "apply_to": "all"
-            }
-        ]
-        
-        result = process_messages_with_regex(messages, rules)
-        self.assertEqual(result, [])
+    assert [m["content"] for m in result] == [f"hi — {i}" for i in range(3)]
+    assert sorted(text for _, text in utils._result_cache) == [m["content"] for m in messages]
+    # a resent conversation is served from the cache without joining again
+    with patch.object(utils, "_apply_passes") as mock_apply:
+        assert process_messages_with_regex(messages, rules) == result
+    mock_apply.assert_not_called()
+    assert len(utils._result_cache) == 3
+
+
+def test_ignore_case_fusion_matches_sequential_re_sub():
+    """Test fused case-insensitive literals agree with applying each rule with re.sub"""
+    text = "xsſkKSK"
+    literals = ["x", "s", "k", "ſ", "K", "S"]
+    for first, second, first_replacement, second_replacement in itertools.product(literals, repeat=4):
+        rules = [_rule(first, first_replacement, "i"), _rule(second, second_replacement, "i")]
+        expected = text
+        for rule in rules:
+            expected = re.sub(rule["pattern"], rule["replacement"], expected, flags=re.IGNORECASE)
+        assert apply_regex_replacements(text, rules) == expected, rules
+
+
+@pytest.mark.parametrize("pattern,uses_re2", [
+    ("hello", True),
+    (r"\bword\b", False),
+    (r"\w+", False),
+    (r"[\d\s]", False),
+    ("end$", False),
+], ids=["plain", "word_boundary", "word_class", "digit_space_class", "dollar"])
+def test_compile_keeps_unicode_sensitive_patterns_on_re(monkeypatch, pattern, uses_re2):
+    """Test patterns RE2 would match differently on non-ASCII text are compiled with re"""
+    fake_re2 = SimpleNamespace(compile=lambda pattern: ("re2", pattern), error=ValueError)
+    monkeypatch.setattr(utils, "re2", fake_re2)
+    _compile.cache_clear()
+    try:
+        compiled = _compile(pattern, "")
+    finally:
+        _compile.cache_clear()
+    assert (compiled == ("re2", pattern)) == uses_re2
+
+
+def test_unhashable_rules_bypass_the_result_cache():
+    """Test rules rebuilt on every call do not add result cache entries that can never be hit"""
+    rules = [_rule("hello", ["not", "hashable"]), _HELLO_TO_HI]
+    utils._result_cache.clear()
     
-    def test_process_messages_with_regex_no_content(self):
-        """Test processing messages with no content"""
-        messages = [
-            {
-                "role": "user",
-                "content": ""
-            },
-            {
-                "role": "assistant",
-                "content": None
-            }
-        ]
-        
-        rules = [
-            {
-                "pattern": "hello",
-                "replacement": "hi",
-                "flags": "i",
-                "apply_to": "all"
-            }
-        ]
-        
-        result = process_messages_with_regex(messages, rules)
-        expected = [
-            {
-                "role": "user",
-                "content": ""
-            },
-            {
-                "role": "assistant",
-                "content": None
-            }
-        ]
-        
-        self.assertEqual(result, expected)
+    for _ in range(3):
+        assert apply_regex_replacements("Hello world", rules) == "hi world"
     
-    def test_process_messages_with_regex_preserves_other_fields(self):
-        """Test that other message fields are preserved"""
-        messages = [
-            {
-                "role": "user",
-                "content": "Hello world",
-                "name": "test_user",
-                "timestamp": "2023-01-01"
-            }
-        ]
-        
-        rules = [
-            {
-                "pattern": "hello",
-                "replacement": "hi",
-                "flags": "i",
-                "apply_to": "all"
-            }
-        ]
-        
-        result = process_messages_with_regex(messages, rules)
-        
-        expected = [
-            {
-                "role": "user",
-                "content": "hi world",
-                "name": "test_user",
-                "timestamp": "2023-01-01"
-            }
-        ]
-        
-        self.assertEqual(result, expected)
-
-
-if __name__ == "__main__":
-    unittest.main()
+    assert _compile_ruleset(rules).ruleset_id is None
+    assert len(utils._result_cache) == 0
@@ -0,0 +1,60 @@
+import pytest
+
+from first_hop_proxy.response_cache import ResponseCache, parse_cache_control
+
+
+class TestResponseCache:
+    """Test suite for the HTTP-aware response cache"""
+
+    @pytest.fixture
+    def cache(self):
+        """Create a small cache instance"""
+        return ResponseCache(maxsize=2)
+
+    def test_parse_cache_control(self):
+        """Test Cache-Control directives are parsed case-insensitively with arguments"""
+        directives = parse_cache_control('Public, Max-Age=60, no-transform, community="UCI"')
+        assert directives == {"public": None, "max-age": "60", "no-transform": None, "community": "UCI"}
+        assert parse_cache_control(None) == {}
+
+    @pytest.mark.parametrize("headers", [
+        {},
+        {"Cache-Control": "no-store, max-age=60"},
+        {"Cache-Control": "private, max-age=60"},
+        {"Cache-Control": "max-age=0"},
+        {"Cache-Control": "max-age=60", "Vary": "Accept-Encoding"},
+    ], ids=["no_headers", "no_store", "private", "zero_max_age", "vary"])
+    def test_store_skips_uncacheable_responses(self, cache, headers):
+        """Test responses are only kept when the upstream allows it"""
+        key = ResponseCache.make_key("GET", "https://test-proxy.example.com/models", b"{}")
+        cache.store(key, headers, {"data": []})
+        assert cache.get(key) is None
+
+    def test_store_fresh_response(self, cache):
+        """Test a max-age response is served fresh"""
+        key = ResponseCache.make_key("GET", "https://test-proxy.example.com/models", b"{}")
+        cache.store(key, {"Cache-Control": "max-age=60"}, {"data": []})
+        entry = cache.get(key)
+        assert entry.is_fresh()
+        assert entry.value == {"data": []}
+
+    def test_store_validator_only_response_is_stale(self, cache):
+        """Test an ETag-only response is kept for revalidation but never served directly"""
+        key = ResponseCache.make_key("GET", "https://test-proxy.example.com/models", b"{}")
+        cache.store(key, {"ETag": '"v1"', "Cache-Control": "no-cache"}, {"data": []})
+        entry = cache.get(key)
+        assert not entry.is_fresh()
+        assert entry.validator_headers() == {"If-None-Match": '"v1"'}
+        assert cache.refresh(key, {"Cache-Control": "max-age=30"}) == {"data": []}
+        assert entry.is_fresh()
+
+    def test_lru_eviction(self, cache):
+        """Test the least recently used entry is evicted past maxsize"""
+        keys = [ResponseCache.make_key("GET", "https://test-proxy.example.com/models", str(i).encode()) for i in range(3)]
+        cache.store(keys[0], {"Cache-Control": "max-age=60"}, 0)
+        cache.store(keys[1], {"Cache-Control": "max-age=60"}, 1)
+        cache.get(keys[0])
+        cache.store(keys[2], {"Cache-Control": "max-age=60"}, 2)
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]).value == 0
+        assert cache.get(keys[2]).value == 2
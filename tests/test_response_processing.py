@@ -3,13 +3,10 @@ Tests for response processing functionality
 """
 import unittest
 import json
-import sys
-import os
+from unittest.mock import patch
 
-# Add src directory to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
-
-from first_hop_proxy.utils import process_response_with_regex
+from first_hop_proxy import utils
+from first_hop_proxy.utils import process_response_with_regex, fix_mojibake, normalize_nfc
 
 
 class TestResponseProcessing(unittest.TestCase):
@@ -349,6 +346,41 @@ class TestResponseProcessing(unittest.TestCase):
         self.assertNotIn("\\u00e2\\u20ac\\u2019", content)
         self.assertEqual(content, "She had a full—lipped smile, wore a \"quoted\" dress, and said 'hello'")
 
+    
+    def test_fix_mojibake(self):
+        """Test mis-decoded UTF-8 is repaired and correct text is left alone, with and without ftfy"""
+        for backend in (utils.ftfy, None):
+            with self.subTest(ftfy=backend is not None), patch.object(utils, "ftfy", backend):
+                self.assertEqual(fix_mojibake("full\u00e2\u20ac\u201dlipped"), "full—lipped")
+                self.assertEqual(fix_mojibake("said \u00e2\u20ac\u0153hi\u00e2\u20ac\u009d"), "said “hi”")
+                self.assertEqual(fix_mojibake("café"), "café")
+                self.assertEqual(fix_mojibake("plain text"), "plain text")
+                # Curly quotes, fullwidth text, HTML entities and ligatures are content, not mojibake
+                self.assertEqual(fix_mojibake("said “hi” ＡＢ &amp; ﬁ\r\n"), "said “hi” ＡＢ &amp; ﬁ\r\n")
+    
+    def test_process_response_with_regex_fix_encoding(self):
+        """Test fix_encoding repairs mojibake before any rules run"""
+        response_data = {
+            "choices": [{"message": {"role": "assistant", "content": "full\u00e2\u20ac\u201dlipped"}}]
+        }
+        rules = [{"pattern": "—", "replacement": "-", "flags": ""}]
+        
+        self.assertEqual(process_response_with_regex(response_data, [], fix_encoding=True)
+                         ["choices"][0]["message"]["content"], "full—lipped")
+        self.assertEqual(process_response_with_regex(response_data, rules, fix_encoding=True)
+                         ["choices"][0]["message"]["content"], "full-lipped")
+
+    
+    def test_process_response_with_regex_normalize(self):
+        """Test normalize composes content to NFC after the rules"""
+        response_data = {"choices": [{"message": {"role": "assistant", "content": "cafe\u0301"}}]}
+        
+        result = process_response_with_regex(response_data, [], normalize=True)
+        
+        self.assertEqual(result["choices"][0]["message"]["content"], "caf\u00e9")
+        text = "plain text"
+        self.assertIs(normalize_nfc(text), text)
+
 
 if __name__ == "__main__":
     unittest.main()
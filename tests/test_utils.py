@@ -0,0 +1,33 @@
+"""
+Tests for the general-purpose helpers in utils
+"""
+import datetime
+import enum
+import json
+
+import pytest
+
+from first_hop_proxy.utils import safe_json_dumps
+
+
+class _Color(enum.Enum):
+    RED = 1
+
+
+@pytest.mark.parametrize("obj", [
+    {"message": "héllo — 你好"},
+    {"values": [float("nan"), float("inf"), 1e16, 1e-7]},
+    {"at": datetime.datetime(2024, 1, 2, 3, 4, 5)},
+    {"big": 2 ** 70, "negative": -(2 ** 64)},
+    {1: "int key", None: "null key", 1.5: "float key"},
+    {"color": _Color.RED, "empty": {}, "items": (1, 2)},
+], ids=["non_ascii", "special_floats", "datetime", "big_ints", "non_str_keys", "other_types"])
+def test_safe_json_dumps_matches_json(obj):
+    """Test safe_json_dumps produces the same text as json.dumps with str() for unknown types"""
+    assert safe_json_dumps(obj) == json.dumps(obj, indent=2, default=str)
+
+
+def test_safe_json_dumps_returns_default_on_failure():
+    """Test unserializable input returns the default string instead of raising"""
+    assert safe_json_dumps({("tuple", "key"): 1}) == "Unable to serialize"
+    assert safe_json_dumps({("tuple", "key"): 1}, default="n/a") == "n/a"